@@ -0,0 +1,190 @@
+import argparse, json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+import pandas as pd
+import numpy as np
+from report_data import (
+    PROP_BRIX_DICT, SPECIAL_BRIX_DICT, get_snapshot, get_order_depth, parse_wallets, with_owner_names,
+    get_overview_data, get_street_data, get_district_data, get_city_data, get_wallets_data
+)
+
+LISTING_COLUMNS = ['tokenId', 'ownerAddress', 'city', 'district', 'street', 'salePrice', 'estimatedValue', 'belowEstimate', 'lastSale', 'osLink']
+HOLDING_COLUMNS = ['tokenId', 'ownerAddress', 'city', 'district', 'street', 'lastSale', 'numSales']
+MAX_CACHED_RESPONSES = 2048
+CACHE_CONTROL = 'public, max-age=60'
+
+def to_json(value):
+    if isinstance(value, pd.DataFrame):
+        return json.loads(value.to_json(orient='records'))
+    if isinstance(value, np.generic):
+        return value.item()
+
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def get_order_book_data(frames, level, name):
+    return {
+        'asks': get_order_depth(frames['orders'], 'ask', level, name)[['tokenId', 'street', 'saleType', 'price']],
+        'bids': get_order_depth(frames['orders'], 'bid', level, name)[['tokenId', 'street', 'price']]
+    }
+
+def street_response(frames, street_name):
+    if not (frames['all']['street']==street_name).any():
+        raise LookupError(street_name)
+
+    data = get_street_data(frames, street_name)
+    brix = {'special': SPECIAL_BRIX_DICT.get(street_name)} if data['city'] == 'Special' else PROP_BRIX_DICT[data['city']]
+
+    return {
+        'street': street_name,
+        'city': data['city'],
+        'streetsCompleted': data['streetsCompleted'],
+        'streetOwners': data['streetOwners'],
+        'floorPrice': data['floorPrice'],
+        'fullStreetPrice': data['fullStreetPrice'],
+        'fullStreetValue': data['fullStreetValue'],
+        'estimatedValue': data['estimatedValue'],
+        'totalEstimatedValue': data['totalEstimatedValue'],
+        'belowEstimate': data['belowEstimate'],
+        'brix': brix,
+        'owners': data['owners'],
+        'listings': data['listings'][LISTING_COLUMNS],
+        'orderBook': get_order_book_data(frames, 'street', street_name)
+    }
+
+def district_response(frames, district_name):
+    if district_name == 'Special' or not (frames['all']['district']==district_name).any():
+        raise LookupError(district_name)
+
+    data = get_district_data(frames, district_name)
+
+    return {
+        'district': district_name,
+        'city': data['city'],
+        'streetsBuilt': data['streetsBuilt'],
+        'districtsBuilt': data['districtsBuilt'],
+        'floorPrice': data['floorPrice'],
+        'fullDistrictValue': data['fullDistrictValue'],
+        'estimatedValue': data['estimatedValue'],
+        'totalEstimatedValue': data['totalEstimatedValue'],
+        'belowEstimate': data['belowEstimate'],
+        'brix': PROP_BRIX_DICT[data['city']],
+        'owners': data['owners'],
+        'listings': data['listings'][LISTING_COLUMNS],
+        'orderBook': get_order_book_data(frames, 'district', district_name)
+    }
+
+def city_response(frames, city_name):
+    if city_name not in PROP_BRIX_DICT:
+        raise LookupError(city_name)
+
+    data = get_city_data(frames, city_name)
+
+    return {
+        'city': city_name,
+        'streetsBuilt': data['streetsBuilt'],
+        'districtsBuilt': data['districtsBuilt'],
+        'citiesBuilt': data['citiesBuilt'],
+        'floorPrice': data['floorPrice'],
+        'estimatedValue': data['estimatedValue'],
+        'totalEstimatedValue': data['totalEstimatedValue'],
+        'belowEstimate': data['belowEstimate'],
+        'brix': PROP_BRIX_DICT[city_name],
+        'owners': data['owners'],
+        'listings': data['listings'][LISTING_COLUMNS],
+        'orderBook': get_order_book_data(frames, 'city', city_name)
+    }
+
+def owner_response(frames, wallet_input):
+    # One or more comma separated addresses, rolled up as a single owner like the wallets report
+    wallets = parse_wallets(wallet_input)
+
+    if len(wallets) == 0:
+        raise LookupError(wallet_input)
+
+    data = get_wallets_data(frames, wallets)
+
+    return {
+        'wallets': data['wallets'],
+        'properties': len(data['properties']),
+        'streets': data['streets'],
+        'districts': data['districts'],
+        'cities': data['cities'],
+        'holdings': data['properties'][HOLDING_COLUMNS].sort_values(by='street'),
+        'listings': data['listings'][LISTING_COLUMNS]
+    }
+
+ROUTES = {
+    'street': street_response,
+    'district': district_response,
+    'city': city_response,
+    'owner': owner_response
+}
+
+def add_owner_names(frames, response):
+    # Display names are joined in last, the same way the app does when it renders a table
+    for key, value in response.items():
+        if isinstance(value, pd.DataFrame) and 'ownerAddress' in value:
+            response[key] = with_owner_names(value, frames['identities'])
+
+    return response
+
+def get_response(frames, path):
+    parts = [unquote(part) for part in path.strip('/').split('/')]
+
+    if parts == ['api', 'overview']:
+        return add_owner_names(frames, get_overview_data(frames))
+    if len(parts) == 3 and parts[0] == 'api' and parts[1] in ROUTES:
+        return add_owner_names(frames, ROUTES[parts[1]](frames, parts[2]))
+
+    raise LookupError(path)
+
+class ReportHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        # The ETag and body must come from the same snapshot, one that stays fixed after a rollover
+        snapshot = get_snapshot()
+        etag = f'"{snapshot["etag"]}"'
+        path = urlparse(self.path).path
+        body = snapshot['responses'].get(path)
+
+        # Resolve the route before the conditional check, so unknown paths are a 404 whatever the tag
+        if body is None:
+            try:
+                body = json.dumps(get_response(snapshot['frames'], path), default=to_json).encode('utf-8')
+            except LookupError:
+                self.send_error(404, 'Not Found')
+                return
+
+            if len(snapshot['responses']) < MAX_CACHED_RESPONSES:
+                snapshot['responses'][path] = body
+
+        # Every response is derived from the snapshot, so its ETag is valid for all of them
+        if_none_match = self.headers.get('If-None-Match')
+
+        if if_none_match is not None and (if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', CACHE_CONTROL)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', CACHE_CONTROL)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Property's report data as JSON")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), ReportHandler)
+    print(f'Serving report data on http://{args.host}:{args.port}/api/overview')
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+import json, re, threading, time, uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+# In-memory stand-in for the subset of the GCS JSON API used by gcsfs (the app) and
+# google-cloud-storage (the ingestion job). Point both at it with STORAGE_EMULATOR_HOST.
+
+class FakeBucketStore:
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.lock = threading.Lock()
+
+    def put(self, bucket, name, data, content_type='application/octet-stream', cache_control=None):
+        with self.lock:
+            generation = str(time.time_ns())
+            self.objects[(bucket, name)] = {
+                'data': data,
+                'metadata': {
+                    'kind': 'storage#object',
+                    'bucket': bucket,
+                    'name': name,
+                    'id': f'{bucket}/{name}/{generation}',
+                    'size': str(len(data)),
+                    'contentType': content_type,
+                    'cacheControl': cache_control,
+                    'generation': generation,
+                    'metageneration': '1',
+                    'updated': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+                }
+            }
+
+    def get(self, bucket, name):
+        with self.lock:
+            return self.objects.get((bucket, name))
+
+    def delete(self, bucket, name):
+        with self.lock:
+            return self.objects.pop((bucket, name), None)
+
+    def list(self, bucket, prefix=''):
+        with self.lock:
+            return [obj['metadata'] for (b, name), obj in sorted(self.objects.items()) if b == bucket and name.startswith(prefix)]
+
+class StubServer(ThreadingHTTPServer):
+    # Ingestion opens up to THUMBNAIL_WORKERS connections at once, more than the default backlog of 5
+    request_queue_size = 128
+
+OBJECT_PATH = re.compile(r'^(?:/download)?/storage/v1/b/([^/]+)/o/(.+)$')
+LIST_PATH = re.compile(r'^/storage/v1/b/([^/]+)/o/?$')
+UPLOAD_PATH = re.compile(r'^/upload/storage/v1/b/([^/]+)/o/?$')
+
+def make_handler(store):
+    class FakeGCSHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, body):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def not_found(self):
+            self.send_json(404, {'error': {'code': 404, 'message': 'Not Found'}})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+
+            if (match := LIST_PATH.match(url.path)):
+                prefix = query.get('prefix', [''])[0]
+                return self.send_json(200, {'kind': 'storage#objects', 'items': store.list(match.group(1), prefix)})
+
+            if not (match := OBJECT_PATH.match(url.path)):
+                return self.not_found()
+
+            obj = store.get(match.group(1), unquote(match.group(2)))
+
+            if obj is None:
+                return self.not_found()
+            if query.get('alt', [''])[0] != 'media':
+                return self.send_json(200, obj['metadata'])
+
+            data = obj['data']
+            status = 200
+
+            # gcsfs reads in ranges
+            if (range_header := self.headers.get('Range')):
+                start, _, end = range_header.replace('bytes=', '').partition('-')
+                start = int(start or 0)
+                end = min(int(end), len(data) - 1) if end else len(data) - 1
+                data = data[start:end + 1]
+                status = 206
+
+            self.send_response(status)
+            self.send_header('Content-Type', obj['metadata']['contentType'])
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('x-goog-generation', obj['metadata']['generation'])
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+
+            if not (match := UPLOAD_PATH.match(url.path)):
+                return self.not_found()
+
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            upload_type = query.get('uploadType', ['media'])[0]
+
+            if upload_type == 'resumable':
+                # Payloads over 8MB, like a large crawl checkpoint, start a session and arrive by PUT
+                metadata = json.loads(body or b'{}')
+                metadata.setdefault('name', query.get('name', [None])[0])
+                upload_id = uuid.uuid4().hex
+
+                with store.lock:
+                    store.uploads[upload_id] = {'bucket': match.group(1), 'metadata': metadata, 'data': b''}
+
+                self.send_response(200)
+                self.send_header('Location', f'http://{self.headers["Host"]}{url.path}?uploadType=resumable&upload_id={upload_id}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            if upload_type == 'multipart':
+                # First part is the object metadata, second part is the data
+                message = BytesParser(policy=HTTP).parsebytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode('utf-8') + body
+                )
+                parts = list(message.iter_parts())
+                metadata = json.loads(parts[0].get_payload(decode=True))
+                data = parts[1].get_payload(decode=True)
+                content_type = parts[1].get_content_type()
+            else:
+                metadata = {'name': query['name'][0]}
+                data = body
+                content_type = self.headers.get('Content-Type', 'application/octet-stream')
+
+            store.put(match.group(1), metadata['name'], data, metadata.get('contentType', content_type), metadata.get('cacheControl'))
+            self.send_json(200, store.get(match.group(1), metadata['name'])['metadata'])
+
+        def do_PUT(self):
+            query = parse_qs(urlparse(self.path).query)
+            upload = store.uploads.get(query.get('upload_id', [''])[0])
+
+            if upload is None:
+                return self.not_found()
+
+            upload['data'] += self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+            # Content-Range is "bytes start-end/total", the total is "*" until the last chunk
+            total = self.headers.get('Content-Range', '').rpartition('/')[2]
+
+            if total == '*' or len(upload['data']) < int(total or 0):
+                self.send_response(308)
+                self.send_header('Range', f"bytes=0-{len(upload['data']) - 1}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            metadata = upload['metadata']
+            store.put(upload['bucket'], metadata['name'], upload['data'], metadata.get('contentType', 'application/octet-stream'), metadata.get('cacheControl'))
+            store.uploads.pop(query['upload_id'][0], None)
+            self.send_json(200, store.get(upload['bucket'], metadata['name'])['metadata'])
+
+        def do_DELETE(self):
+            if not (match := OBJECT_PATH.match(urlparse(self.path).path)) or \
+                    store.delete(match.group(1), unquote(match.group(2))) is None:
+                return self.not_found()
+
+            self.send_response(204)
+            self.end_headers()
+
+    return FakeGCSHandler
+
+def start_fake_gcs(store=None, host='127.0.0.1', port=0):
+    store = store or FakeBucketStore()
+    server = StubServer((host, port), make_handler(store))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, store
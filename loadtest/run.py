@@ -0,0 +1,216 @@
+import argparse, asyncio, contextlib, os, random, socket, subprocess, sys, threading, time
+from urllib.parse import urlencode
+from urllib.request import urlopen
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from tornado.websocket import websocket_connect
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'scripts')]
+
+from loadtest.fake_gcs import start_fake_gcs
+from loadtest.stub_opensea import start_stub_opensea
+
+REPORTS = ['overview', 'owner', 'wallets', 'street', 'district', 'city']
+
+def ingest(opensea_url):
+    # Run the real ingestion job against the stand-ins so the app reads a snapshot it produced
+    os.environ['OPEN_SEA_BASE_URL'] = opensea_url
+    os.environ.setdefault('OPEN_SEA_API_KEY', 'loadtest')
+
+    import main
+    start = time.perf_counter()
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        main.run(None, None)
+
+    return time.perf_counter() - start
+
+def make_session_plans(count, seed):
+    # Query params for each simulated visitor, spread across every report type
+    from report_data import get_snapshot
+
+    df = get_snapshot()['frames']['all']
+    owners = df['ownerAddress'].value_counts().index.to_list()
+    streets = df['street'].drop_duplicates().to_list()
+    districts = df.loc[df['district']!='Special', 'district'].drop_duplicates().to_list()
+    cities = df.loc[df['city']!='Special', 'city'].drop_duplicates().to_list()
+
+    rng = random.Random(seed)
+    plans = []
+
+    for i in range(count):
+        report = REPORTS[i % len(REPORTS)]
+        params = {'report': report}
+
+        if report == 'owner':
+            params['owner'] = rng.choice(owners[:50])
+        elif report == 'wallets':
+            params['wallets'] = ','.join(rng.sample(owners[:200], 5))
+        elif report == 'street':
+            params['street'] = rng.choice(streets)
+        elif report == 'district':
+            params['district'] = rng.choice(districts)
+        elif report == 'city':
+            params['city'] = rng.choice(cities)
+
+        plans.append(params)
+
+    return plans
+
+async def run_session(ws_url, params, timeout):
+    # Speak the browser's websocket protocol: request a script run with the report's
+    # query params and wait for the server to report that the run finished
+    start = time.perf_counter()
+    connection = await websocket_connect(ws_url)
+
+    back_msg = BackMsg()
+    back_msg.rerun_script.query_string = urlencode(params)
+    await connection.write_message(back_msg.SerializeToString(), binary=True)
+
+    errors = []
+
+    try:
+        while True:
+            data = await asyncio.wait_for(connection.read_message(), timeout)
+
+            if data is None:
+                errors.append('connection closed before the script finished')
+                break
+
+            forward_msg = ForwardMsg()
+            forward_msg.ParseFromString(data)
+            kind = forward_msg.WhichOneof('type')
+
+            if kind == 'delta' and forward_msg.delta.WhichOneof('type') == 'new_element' \
+                    and forward_msg.delta.new_element.WhichOneof('type') == 'exception':
+                errors.append(forward_msg.delta.new_element.exception.message)
+            elif kind == 'script_finished':
+                break
+    except asyncio.TimeoutError:
+        errors.append(f'no script_finished within {timeout}s')
+    finally:
+        connection.close()
+
+    return params['report'], time.perf_counter() - start, errors
+
+async def run_sessions(ws_url, plans, concurrency, timeout):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(params):
+        async with semaphore:
+            return await run_session(ws_url, params, timeout)
+
+    return await asyncio.gather(*(limited(params) for params in plans))
+
+def start_app(port, env):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', os.path.join(ROOT, 'streamlit_app.py'),
+         '--server.headless', 'true', '--server.port', str(port), '--browser.gatherUsageStats', 'false'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    for _ in range(120):
+        try:
+            with urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.5)
+
+    process.terminate()
+    raise RuntimeError('Streamlit server did not become healthy')
+
+def rss_mb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+    return 0.0
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid, interval=0.1):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = rss_mb(pid)
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, rss_mb(self.pid))
+
+def percentile(values, pct):
+    values = sorted(values)
+
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive concurrent app sessions against local GCS and OpenSea stand-ins')
+    parser.add_argument('--sessions', type=int, default=60, help='total sessions to run')
+    parser.add_argument('--concurrency', type=int, default=8, help='sessions running at the same time')
+    parser.add_argument('--units-per-street', type=int, default=40, help='size of the synthetic collection')
+    parser.add_argument('--timeout', type=float, default=120, help='seconds allowed for a single session')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    gcs_server, _ = start_fake_gcs()
+    os.environ['STORAGE_EMULATOR_HOST'] = f'http://{gcs_server.server_address[0]}:{gcs_server.server_address[1]}'
+
+    _, opensea_url = start_stub_opensea(units_per_street=args.units_per_street, seed=args.seed)
+
+    print(f'Ingesting synthetic collection from {opensea_url}')
+    print(f'Ingestion took {ingest(opensea_url):.2f}s')
+
+    plans = make_session_plans(args.sessions, args.seed)
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    app = start_app(port, dict(os.environ))
+    ws_url = f'ws://127.0.0.1:{port}/_stcore/stream'
+
+    try:
+        # One warm-up session so the shared snapshot load is not counted against the first batch
+        asyncio.run(run_sessions(ws_url, [{'report': 'overview'}], 1, args.timeout))
+        baseline_rss = rss_mb(app.pid)
+
+        sampler = RssSampler(app.pid)
+        sampler.start()
+        start = time.perf_counter()
+        results = asyncio.run(run_sessions(ws_url, plans, args.concurrency, args.timeout))
+        wall_time = time.perf_counter() - start
+        sampler.stopped.set()
+    finally:
+        app.terminate()
+        app.wait()
+
+    print(f'\n{len(results)} sessions, concurrency {args.concurrency}, {wall_time:.2f}s wall time')
+    print(f'Throughput: {len(results) / wall_time:.2f} sessions/s')
+    print(f'App memory: {baseline_rss:.0f} MB after warm-up, {sampler.peak:.0f} MB peak, '
+          f'~{(sampler.peak - baseline_rss) / args.concurrency:.1f} MB per concurrent session\n')
+
+    print(f"{'report':<10}{'runs':>6}{'errors':>8}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+
+    for report in REPORTS + ['all']:
+        rows = [row for row in results if report in ('all', row[0])]
+
+        if not rows:
+            continue
+
+        latencies = [elapsed for _, elapsed, _ in rows]
+        errors = sum(1 for _, _, errs in rows if errs)
+        print(f'{report:<10}{len(rows):>6}{errors:>8}' + ''.join(f'{value:>8.3f}s' for value in [
+            percentile(latencies, 50), percentile(latencies, 90), percentile(latencies, 99), max(latencies)
+        ]))
+
+    failures = [(report, errs) for report, _, errs in results if errs]
+
+    for report, errs in failures[:5]:
+        print(f'\n{report} failed: {errs[0]}')
+
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
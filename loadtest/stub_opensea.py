@@ -0,0 +1,133 @@
+import base64, json, random, threading, time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+from loadtest.fake_gcs import StubServer
+
+CITY_NAMES = ['Beige Bay', 'Orange Oasis', 'Yellow Yards', 'Green Grove', 'Purple Palms', 'Blue Bayside', 'X AE X-II']
+SPECIAL_NAMES = ['Casa Blanca', 'Mystical Rocks', 'Candy Castle', 'Le Tower', 'Mount Proper', 'The Money Pool']
+WEI_PER_ETH = 10**18
+
+# 1x1 transparent PNG served for every image URL
+PIXEL_PNG = base64.b64decode('iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg==')
+
+def make_collection(base_url, districts_per_city=6, streets_per_district=5, units_per_street=40, owners=1500, listed_ratio=0.08, bid_ratio=0.05, seed=1):
+    # A collection shaped like Property's: cities -> districts -> streets -> units, plus a few specials.
+    # Owner sizes follow a long tail so a handful of wallets complete streets and districts.
+    rng = random.Random(seed)
+    addresses = [f'0x{rng.getrandbits(160):040x}' for _ in range(owners)]
+    weights = [1 / (rank + 1) for rank in range(owners)]
+    assets = []
+    now = int(time.time())
+
+    def make_asset(traits, image_key):
+        token_id = str(len(assets) + 1)
+        owner_index = rng.choices(range(owners), weights)[0]
+        owner = addresses[owner_index]
+        image = f'{base_url}/images/{image_key}.png'
+        asset = {
+            'token_id': token_id,
+            'num_sales': rng.randint(0, 5),
+            'image_url': image,
+            'image_preview_url': f'{image}?s=250',
+            'image_thumbnail_url': f'{image}?s=128',
+            'name': f'Property #{token_id}',
+            'permalink': f'{base_url}/assets/{token_id}',
+            'last_sale': {'total_price': str(rng.randint(1, 200) * WEI_PER_ETH // 100)} if rng.random() < 0.7 else None,
+            'owner': {'address': owner, 'user': {'username': f'user{owner_index}'} if rng.random() < 0.5 else None},
+            'seaport_sell_orders': None,
+            'seaport_buy_orders': None,
+            'traits': traits
+        }
+
+        # Listed units can carry several asks in no particular order, including auctions and expired ones
+        if rng.random() < listed_ratio:
+            asset['seaport_sell_orders'] = [{
+                'current_price': str(rng.randint(2, 300) * WEI_PER_ETH // 100),
+                'sale_type': rng.choices(['basic', 'english'], [9, 1])[0],
+                'expiration_time': rng.choices([0, now + 86400, now - 86400], [6, 3, 1])[0]
+            } for _ in range(rng.choices([1, 2, 3], [6, 3, 1])[0])]
+
+        if rng.random() < bid_ratio:
+            asset['seaport_buy_orders'] = [{
+                'current_price': str(rng.randint(1, 150) * WEI_PER_ETH // 100),
+                'sale_type': 'basic',
+                'expiration_time': now + 86400
+            } for _ in range(rng.randint(1, 2))]
+
+        assets.append(asset)
+
+    for city in CITY_NAMES:
+        for d in range(districts_per_city):
+            district = f'{city} District {d + 1}'
+
+            for s in range(streets_per_district):
+                street = f'{district} Street {s + 1}'
+
+                for unit in range(units_per_street):
+                    make_asset([
+                        {'trait_type': 'City Name', 'value': city},
+                        {'trait_type': 'District Name', 'value': district},
+                        {'trait_type': 'Street Name', 'value': street},
+                        {'trait_type': 'Unit', 'value': unit + 1}
+                    ], f'{city}-{d}-{s}'.replace(' ', '_'))
+
+    for special in SPECIAL_NAMES:
+        make_asset([{'trait_type': 'Special', 'value': special}], special.replace(' ', '_'))
+
+    return assets
+
+def make_handler(assets, page_size=50, fail_rate=0.0, seed=2):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    class StubOpenSeaHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+
+            with lock:
+                fail = rng.random() < fail_rate
+
+            if fail:
+                self.send_response(503)
+                self.end_headers()
+                return
+
+            if url.path.startswith('/images/'):
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/png')
+                self.send_header('Content-Length', str(len(PIXEL_PNG)))
+                self.end_headers()
+                self.wfile.write(PIXEL_PNG)
+                return
+
+            if url.path != '/api/v1/assets':
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            # The cursor is just the offset of the next page
+            query = parse_qs(url.query)
+            offset = int(query.get('cursor', ['0'])[0])
+            limit = int(query.get('limit', [str(page_size)])[0])
+            page = assets[offset:offset + limit]
+            next_cursor = str(offset + limit) if offset + limit < len(assets) else None
+
+            payload = json.dumps({'assets': page, 'next': next_cursor, 'previous': None}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return StubOpenSeaHandler
+
+def start_stub_opensea(host='127.0.0.1', port=0, fail_rate=0.0, **collection_options):
+    server = StubServer((host, port), None)
+    base_url = f'http://{host}:{server.server_address[1]}'
+    server.RequestHandlerClass = make_handler(make_collection(base_url, **collection_options), fail_rate=fail_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, base_url
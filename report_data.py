@@ -0,0 +1,539 @@
+import datetime, hashlib, io, json, re, threading, time
+import fsspec
+import pandas as pd
+import numpy as np
+
+PROPERTIES_URL = 'gcs://propertys-opensea/properties.json'
+ORDERS_URL = 'gcs://propertys-opensea/orders.json'
+IDENTITIES_URL = 'gcs://propertys-opensea/identities.json'
+MANIFEST_URL = 'gcs://propertys-opensea/snapshot.json'
+SNAPSHOT_URLS = {'properties': PROPERTIES_URL, 'orders': ORDERS_URL, 'identities': IDENTITIES_URL}
+SNAPSHOT_TTL = 300
+
+# Fair value model: pseudo-observations pulling a district towards its city (and a city towards
+# the whole collection), how much an ask counts next to a sale, and how many sales it takes
+# before a unit's own last sale outweighs its district
+VALUATION_PRIOR = 5
+LISTING_WEIGHT = 0.5
+UNIT_SALE_PRIOR = 3
+
+PROP_BRIX_DICT = {
+    'Beige Bay': {'house': 10, 'street': 370, 'district': 1610, 'city': 9050},
+    'Orange Oasis': {'house': 20, 'street': 490, 'district': 2070, 'city': 11550},
+    'Yellow Yards': {'house': 30, 'street': 610, 'district': 2530, 'city': 11520},
+    'Green Grove': {'house': 40, 'street': 730, 'district': 2640, 'city': 13560},
+    'Purple Palms': {'house': 50, 'street': 850, 'district': 3450, 'city': 15600},
+    'Blue Bayside': {'house': 60, 'street': 970, 'district': 3910, 'city': 13730},
+    'X AE X-II': {'house': 80, 'street': 1210, 'district': 5230, 'city': 19990}
+}
+
+SPECIAL_BRIX_DICT = {
+    'Casa Blanca': 250,
+    'Mystical Rocks': 250,
+    'Spiky Singers': 250,
+    'The Guardian': 250,
+    'Candy Castle': 600,
+    'Cathedral of Wisdom': 600,
+    'Palace of Eternity': 600,
+    "Peter's Great Wall": 600,
+    "Property's Stadium": 600,
+    'The Impossible Bridge': 600,
+    'Ancient Labyrinth': 1200,
+    'Fort in the Leaves': 1200,
+    'Great Temple of Peter': 1200,
+    'Le Tower': 1200,
+    'Mount Proper': 1200,
+    'Question Cat': 1200,
+    'The Emperors Arena': 1200,
+    'The Money Pool': 1200,
+    'The Secret Glass Pyramid': 1200,
+    'The Sunken City': 1200
+}
+
+def read_blob(url):
+    with fsspec.open(url, 'rb', token='anon') as f:
+        return f.read()
+
+def read_optional_blob(url):
+    try:
+        return read_blob(url)
+    except FileNotFoundError:
+        return None
+
+def load_data(raw=None):
+    # df = pd.read_json(
+    #     'gcs://propertys-opensea/properties.json',
+    #     storage_options={'token': st.secrets['gcp_service_account']}
+    # )
+
+    df = pd.read_json(io.BytesIO(raw if raw is not None else read_blob(PROPERTIES_URL)))
+
+    return df
+
+def load_orders(raw=None):
+    # Every live order per token, kept apart from the property frame
+    raw = raw if raw is not None else read_optional_blob(ORDERS_URL)
+
+    if raw is None:
+        return pd.DataFrame(columns=['tokenId', 'side', 'saleType', 'price', 'expiry'])
+
+    return pd.read_json(io.BytesIO(raw))
+
+def load_identities(raw=None):
+    # Usernames and ENS names per owner address, written by the ingestion job
+    raw = raw if raw is not None else read_optional_blob(IDENTITIES_URL)
+
+    if raw is None:
+        return pd.DataFrame(columns=['address', 'username', 'ensName', 'resolvedAt'])
+
+    return pd.read_json(io.BytesIO(raw), dtype=False)
+
+def build_identity_index(df, df_identities):
+    # One display name per owner, positioned by the owner's categorical code. Reports join names
+    # in when they render instead of every property row carrying one.
+    addresses = pd.Index(df['ownerAddress'].dropna().unique()).sort_values()
+    df_names = df_identities.drop_duplicates('address').set_index('address').reindex(addresses)
+
+    # ENS first, then the OpenSea username, then the address itself
+    names = df_names['ensName'].fillna(df_names['username']).fillna(addresses.to_series())
+
+    # Lowercased names back to addresses, so owners can be searched by either
+    lookup = {}
+
+    for column in ['username', 'ensName']:
+        lookup.update({name.lower(): address for address, name in df_names[column].dropna().items()})
+
+    return {'addresses': addresses, 'names': names.to_numpy(dtype=object), 'lookup': lookup}
+
+def get_owner_names(identities, addresses):
+    codes = pd.Categorical(addresses, categories=identities['addresses']).codes
+    names = np.asarray(addresses, dtype=object).copy()
+    known = codes >= 0
+    names[known] = identities['names'][codes[known]]
+
+    return names
+
+def with_owner_names(df_subset, identities):
+    df_named = df_subset.copy()
+    df_named.insert(df_named.columns.get_loc('ownerAddress') + 1, 'ownerName', get_owner_names(identities, df_named['ownerAddress']))
+
+    return df_named
+
+def resolve_owner(identities, owner_name):
+    # Names first, usernames like "0xBGoat" look like addresses but aren't
+    owner_name_lower = owner_name.strip().lower()
+
+    if owner_name_lower in identities['lookup']:
+        return identities['lookup'][owner_name_lower]
+
+    return owner_name_lower if owner_name_lower.startswith('0x') else None
+
+def add_valuations(df):
+    # Fits a log-price level per district from last sales and basic listings, shrunk towards the
+    # city level when a district has few of either, then leans each unit towards its own last
+    # sale by how often it has traded. It's all grouped sums, so every unit is scored in one pass.
+    specials = df['city'] == 'Special'
+
+    # Specials are priced against others of the same $BRIX tier, each one as its own "district"
+    city_key = df['city'].where(~specials, 'Special ' + df['street'].map(SPECIAL_BRIX_DICT).astype(str))
+    district_key = df['district'].where(~specials, df['street'])
+
+    log_sale = np.log(df['lastSale'].where(df['lastSale'] > 0))
+    log_ask = np.log(df['salePrice'].where((df['salePrice'] > 0) & (df['saleType'] == 'basic')))
+
+    sale_weight = log_sale.notna().astype(float)
+    ask_weight = log_ask.notna() * LISTING_WEIGHT
+    weight = sale_weight + ask_weight
+    weighted = log_sale.fillna(0) * sale_weight + log_ask.fillna(0) * ask_weight
+
+    global_level = weighted.sum() / weight.sum() if weight.sum() > 0 else np.nan
+
+    city_level = (weighted.groupby(city_key).transform('sum') + VALUATION_PRIOR * global_level) \
+        / (weight.groupby(city_key).transform('sum') + VALUATION_PRIOR)
+
+    gb_district = [city_key, district_key]
+    district_level = (weighted.groupby(gb_district).transform('sum') + VALUATION_PRIOR * city_level) \
+        / (weight.groupby(gb_district).transform('sum') + VALUATION_PRIOR)
+
+    num_sales = df['numSales'].fillna(0)
+    unit_weight = (num_sales / (num_sales + UNIT_SALE_PRIOR)).where(log_sale.notna(), 0)
+    log_value = district_level + unit_weight * (log_sale.fillna(district_level) - district_level)
+
+    df['estimatedValue'] = np.exp(log_value).round(4)
+    df['belowEstimate'] = log_ask.notna() & (df['salePrice'] < df['estimatedValue'])
+
+    return df
+
+def get_valuation_summary(df_subset):
+    return {
+        'estimatedValue': round(df_subset['estimatedValue'].median(), 4) if len(df_subset) > 0 else None,
+        'totalEstimatedValue': round(df_subset['estimatedValue'].sum(), 4),
+        'belowEstimate': int(df_subset['belowEstimate'].sum())
+    }
+
+def get_street_values(df_subset):
+    # Estimated value of the 7 cheapest units of each street, what a full street is worth there
+    df_cheapest = df_subset.sort_values(by='estimatedValue', kind='stable').groupby('street').head(7)
+    gb_street = df_cheapest.groupby('street').estimatedValue
+
+    return gb_street.sum().loc[gb_street.size() == 7]
+
+def get_estimated_full_street(df_street):
+    street_values = get_street_values(df_street)
+
+    return round(street_values.iat[0], 4) if len(street_values) > 0 else None
+
+def get_estimated_full_district(df_district):
+    street_values = get_street_values(df_district)
+
+    return round(street_values.nsmallest(3).sum(), 4) if len(street_values) >= 3 else None
+
+def get_completion_values(df_street, owners):
+    # Estimated cost of the units each owner is missing from their next full street, picking
+    # the lowest valued units held by anyone else. Zero once their units make up whole streets.
+    df_sorted = df_street.sort_values(by='estimatedValue', kind='stable')
+    values = []
+
+    for owner_address, property_count in zip(owners['ownerAddress'], owners['propertyCount']):
+        missing = -property_count % 7
+        others = df_sorted.loc[df_sorted['ownerAddress']!=owner_address, 'estimatedValue']
+        values.append(round(others.iloc[:missing].sum(), 4) if len(others) >= missing else None)
+
+    return values
+
+def build_listing_index(df):
+    # Basic listings sorted by price within each street, district and city, so every
+    # report can read floors, cheapest-N costs and listing pages from contiguous slices
+    listings = df.loc[(df['salePrice'] > 0) & (df['saleType'] == 'basic')]
+    index = {'sorted': listings.sort_values(by='salePrice', kind='stable')}
+
+    for level in ['street', 'district', 'city']:
+        df_level = listings.sort_values(by=[level, 'salePrice'], kind='stable').reset_index(drop=True)
+        gb_level = df_level.groupby(level, sort=False)
+        df_level['rank'] = gb_level.cumcount()
+        df_level['cumPrice'] = gb_level['salePrice'].cumsum()
+
+        counts = gb_level.size()
+        starts = counts.cumsum() - counts
+
+        index[level] = {
+            'listings': df_level,
+            'bounds': {name: (start, start + count) for name, start, count in zip(counts.index, starts, counts)}
+        }
+
+    return index
+
+def get_listings(index, level, name, limit=None, offset=0):
+    start, end = index[level]['bounds'].get(name, (0, 0))
+    start = min(start + offset, end)
+    end = end if limit is None else min(end, start + limit)
+
+    return index[level]['listings'].iloc[start:end]
+
+def get_floor_price(index, level, name):
+    start, end = index[level]['bounds'].get(name, (0, 0))
+
+    return index[level]['listings']['salePrice'].iat[start] if end > start else None
+
+def get_cheapest_cost(index, level, name, count):
+    start, end = index[level]['bounds'].get(name, (0, 0))
+
+    return index[level]['listings']['cumPrice'].iat[start + count - 1] if end - start >= count else None
+
+def build_order_book(df, df_orders):
+    now = datetime.datetime.now().timestamp()
+    expiry = df_orders['expiry'].fillna(0)
+    df_live = df_orders.loc[(expiry <= 0) | (expiry > now)]
+
+    # Only the location columns are joined in, as categories, so the book stays small
+    df_locations = df.set_index('tokenId')[['city', 'district', 'street']].astype('category')
+    df_book = df_live.join(df_locations, on='tokenId')
+
+    return {
+        'ask': df_book.loc[df_book['side']=='ask'].sort_values(by='price', kind='stable'),
+        'bid': df_book.loc[df_book['side']=='bid'].sort_values(by='price', ascending=False, kind='stable')
+    }
+
+def get_order_depth(order_book, side, level, name, depth=5):
+    # Orders can expire while a snapshot is being served, so check again on every lookup
+    df_side = order_book[side]
+    expiry = df_side['expiry'].fillna(0)
+    live = (expiry <= 0) | (expiry > datetime.datetime.now().timestamp())
+
+    return df_side.loc[(df_side[level]==name) & live].head(depth)
+
+def get_next_expiry(order_book, now):
+    # When the next order in the book lapses, which changes any order book shown after it
+    expiry = pd.concat([order_book['ask']['expiry'], order_book['bid']['expiry']]).fillna(0)
+    expiry = expiry.loc[expiry > now]
+
+    return expiry.min() if len(expiry) > 0 else float('inf')
+
+def get_data_frames(df, df_orders, df_identities):
+    df = add_valuations(df)
+    df_simple = df[['ownerAddress', 'city', 'district', 'street', 'numSales', 'lastSale', 'salePrice']]
+
+    # TODO: Figure out a more efficient way to do this
+    # Street level grouping
+    gb_owner_street = df.groupby(['ownerAddress', 'city', 'district', 'street'], dropna=False)
+    df_owner_street = gb_owner_street.size().reset_index(name='propertyCount')
+    df_owner_street['streetCount'] = np.floor_divide(df_owner_street['propertyCount'], 7)
+
+    # District level grouping
+    gb_owner_district = df_owner_street.groupby(['ownerAddress', 'city', 'district'], dropna=False)
+    df_owner_district = gb_owner_district.streetCount.agg(sum).reset_index(name='streetsInDistrict')
+    df_owner_district['districtCount'] = np.floor_divide(df_owner_district['streetsInDistrict'], 3)
+
+    # City level grouping
+    gb_owner_city = df_owner_district.groupby(['ownerAddress', 'city'], dropna=False)
+    df_owner_city = gb_owner_city.districtCount.agg(sum).reset_index(name='districtsInCity')
+    df_owner_city['cityCount'] = np.floor_divide(df_owner_city['districtsInCity'], 3)
+
+    # Create top 10 dataframes (not worth doing City owners yet)
+    df_top_owners = df.groupby(['ownerAddress'], dropna=False) \
+        .size().reset_index(name='count').sort_values(by='count', ascending=False).head(10)
+    df_top_owners.index = pd.RangeIndex(start=1, stop=len(df_top_owners)+1, step=1)
+
+    df_top_street_owners = df_owner_street.groupby(['ownerAddress'], dropna=False) \
+        .streetCount.agg(sum).reset_index(name='count').sort_values(by='count', ascending=False).head(10)
+    df_top_street_owners.index = pd.RangeIndex(start=1, stop=len(df_top_street_owners)+1, step=1)
+
+    df_top_district_owners = df_owner_district.groupby(['ownerAddress'], dropna=False) \
+        .districtCount.agg(sum).reset_index(name='count').sort_values(by='count', ascending=False).head(10)
+    df_top_district_owners.index = pd.RangeIndex(start=1, stop=len(df_top_district_owners)+1, step=1)
+
+    df_top_city_owners = df_owner_city.groupby(['ownerAddress'], dropna=False) \
+        .cityCount.agg(sum).reset_index(name='count').sort_values(by='count', ascending=False).head(10)
+    df_top_city_owners.index = pd.RangeIndex(start=1, stop=len(df_top_city_owners)+1, step=1)
+
+    return {
+        'all': df,
+        'simple': df_simple,
+        'listings': build_listing_index(df),
+        'orders': build_order_book(df, df_orders),
+        'ownerStreet': df_owner_street,
+        'ownerDistrict': df_owner_district,
+        'ownerCity': df_owner_city,
+        'topOwners': df_top_owners,
+        'topStreetOwners': df_top_street_owners,
+        'topDistrictOwners': df_top_district_owners,
+        'topCityOwners': df_top_city_owners.loc[df_top_city_owners['count']>0],
+        'identities': build_identity_index(df, df_identities)
+    }
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+def get_snapshot_version(hashes):
+    # Same formula as the ingestion job's manifest
+    return hashlib.sha1(','.join(hashes[name] or '' for name in SNAPSHOT_URLS).encode('utf-8')).hexdigest()
+
+def get_snapshot():
+    # One set of frames per process, shared by every Streamlit session and API request. Ingestion
+    # writes snapshot.json after properties, orders and identities, with a hash of each. A snapshot
+    # is only swapped in once the blobs read back match it, so the three always come from one run.
+    global _snapshot
+
+    with _snapshot_lock:
+        now = time.time()
+
+        if _snapshot is None or now - _snapshot['loadedAt'] > SNAPSHOT_TTL:
+            manifest_raw = read_optional_blob(MANIFEST_URL)
+            manifest = json.loads(manifest_raw) if manifest_raw is not None else None
+
+            if _snapshot is not None and manifest is not None and _snapshot['version'] == manifest['version']:
+                _snapshot['loadedAt'] = now
+            else:
+                raws = {name: read_optional_blob(url) for name, url in SNAPSHOT_URLS.items()}
+                hashes = {name: hashlib.sha1(raw).hexdigest() if raw is not None else None for name, raw in raws.items()}
+                version = get_snapshot_version(hashes)
+
+                if _snapshot is not None and (version == _snapshot['version'] or (manifest is not None and version != manifest['version'])):
+                    # Unchanged, or ingestion is partway through writing, keep the current snapshot
+                    _snapshot['loadedAt'] = now
+                else:
+                    frames = get_data_frames(load_data(raws['properties']), load_orders(raws['orders']), load_identities(raws['identities']))
+                    _snapshot = {
+                        'version': version,
+                        'etag': version,
+                        'loadedAt': now,
+                        'nextExpiry': get_next_expiry(frames['orders'], now),
+                        'frames': frames,
+                        'responses': {}
+                    }
+
+        # Cached responses and ETags include the order book, so they roll over as orders expire. The
+        # snapshot is replaced rather than updated, so a reader never pairs an ETag with another's responses.
+        if now >= _snapshot['nextExpiry']:
+            _snapshot = {
+                **_snapshot,
+                'etag': f"{_snapshot['version']}-{int(now)}",
+                'nextExpiry': get_next_expiry(_snapshot['frames']['orders'], now),
+                'responses': {}
+            }
+
+        return _snapshot
+
+def get_wallet_rollups(df_wallets):
+    # Treat the wallets as a single owner so streets split across wallets still count
+    street_counts = np.floor_divide(df_wallets.groupby(['city', 'district', 'street'], dropna=False).size(), 7)
+    district_counts = np.floor_divide(street_counts.groupby(level=['city', 'district'], dropna=False).sum(), 3)
+    city_counts = np.floor_divide(district_counts.groupby(level='city', dropna=False).sum(), 3)
+
+    return street_counts.sum(), district_counts.sum(), city_counts.sum()
+
+def parse_wallets(wallet_input):
+    # Accept addresses separated by commas, spaces or newlines and drop duplicates
+    wallets = [wallet.lower() for wallet in re.split(r'[\s,]+', wallet_input) if wallet.startswith('0x')]
+
+    return list(dict.fromkeys(wallets))
+
+def get_image_urls(df_subset):
+    # Prefer the pre-sized thumbnails cached by the ingestion job, falling back to the OpenSea image
+    if 'thumbnailUrl' in df_subset:
+        return df_subset['thumbnailUrl'].fillna(df_subset['imageUrl'])
+
+    return df_subset['imageUrl']
+
+def get_overview_data(frames):
+    df = frames['all']
+
+    # The 7th cheapest listing of each street carries the running total for the full street
+    df_street_listings = frames['listings']['street']['listings']
+    df_available_streets = df_street_listings.loc[df_street_listings['rank']==6, ['city', 'district', 'street', 'cumPrice']] \
+            .rename(columns={'cumPrice': 'salePrice'}).sort_values(by='salePrice').reset_index(drop=True)
+
+    if (len(df_available_streets) > 0):
+        df_available_streets = df_available_streets[df_available_streets.city != 'Special']
+        df_available_streets['brixYield'] = df_available_streets \
+            .apply(lambda x: PROP_BRIX_DICT[str(x['city']).strip()]['street'], axis=1)
+        df_available_streets['brix/eth'] = df_available_streets['brixYield'] / df_available_streets['salePrice']
+        df_available_streets = df_available_streets.round({'salePrice': 2, 'brix/eth': 2})
+
+    street_columns = ['city', 'district', 'street', 'salePrice', 'brix/eth']
+
+    # Basic listings priced furthest under their estimate
+    df_sorted_listings = frames['listings']['sorted']
+    df_below_estimate = df_sorted_listings.loc[df_sorted_listings['belowEstimate'], ['city', 'district', 'street', 'salePrice', 'estimatedValue', 'osLink']]
+    df_below_estimate['discount'] = (1 - df_below_estimate['salePrice'] / df_below_estimate['estimatedValue']).round(2)
+    df_below_estimate = df_below_estimate.sort_values(by='discount', ascending=False, kind='stable').reset_index(drop=True)
+
+    return {
+        'uniqueOwners': df['ownerAddress'].nunique(),
+        'streets': frames['ownerStreet'].streetCount.sum(),
+        'districts': frames['ownerDistrict'].districtCount.sum(),
+        'cities': frames['ownerCity'].cityCount.sum(),
+        'topOwners': frames['topOwners'][['ownerAddress', 'count']],
+        'topStreetOwners': frames['topStreetOwners'][['ownerAddress', 'count']],
+        'topDistrictOwners': frames['topDistrictOwners'][['ownerAddress', 'count']],
+        'topCityOwners': frames['topCityOwners'][['ownerAddress', 'count']],
+        'cheapestStreets': df_available_streets.reindex(columns=street_columns).head(10),
+        'bestValueStreets': df_available_streets.reindex(columns=street_columns).sort_values(by='brix/eth', ascending=False).head(10),
+        'belowEstimateCount': len(df_below_estimate),
+        'belowEstimateListings': df_below_estimate.head(10)
+    }
+
+def get_street_data(frames, street_name):
+    df = frames['all']
+    df_owner_street = frames['ownerStreet']
+    listing_index = frames['listings']
+
+    df_street = df.loc[df['street']==street_name]
+    df_owner_street_filtered = df_owner_street.loc[df_owner_street['street']==street_name] \
+        .sort_values(by='propertyCount', ascending=False).reset_index(drop=True)
+    df_owner_street_filtered['completionValue'] = get_completion_values(df_street, df_owner_street_filtered)
+
+    return {
+        'city': df_street.iloc[0].city.strip(),
+        'properties': df_street,
+        'owners': df_owner_street_filtered[['ownerAddress', 'propertyCount', 'streetCount', 'completionValue']],
+        'streetsCompleted': df_owner_street_filtered.streetCount.sum(),
+        'streetOwners': len(df_owner_street_filtered.loc[df_owner_street_filtered['streetCount']>0]),
+        'floorPrice': get_floor_price(listing_index, 'street', street_name),
+        'fullStreetPrice': get_cheapest_cost(listing_index, 'street', street_name, 7),
+        'fullStreetValue': get_estimated_full_street(df_street),
+        'listings': get_listings(listing_index, 'street', street_name),
+        **get_valuation_summary(df_street)
+    }
+
+def get_district_data(frames, district_name):
+    df = frames['all']
+    df_owner_street = frames['ownerStreet']
+    df_owner_district = frames['ownerDistrict']
+    listing_index = frames['listings']
+
+    df_district = df.loc[df['district']==district_name]
+    df_owner_street_filtered = df_owner_street.loc[df_owner_street['district']==district_name]
+    df_owner_district_filtered = df_owner_district[df_owner_district['district']==district_name]
+
+    owner_property_counts = df_owner_street_filtered.groupby('ownerAddress').propertyCount.sum()
+    df_owner_district_full = pd.merge(df_owner_district_filtered, owner_property_counts, on="ownerAddress")
+    values = {"ownerAddress": df_owner_district_full["ownerAddress"]}
+    df_owner_district_full.fillna(value=values, inplace=True)
+
+    return {
+        'city': df_district.iloc[0].city.strip(),
+        'properties': df_district,
+        'owners': df_owner_district_full[["ownerAddress", "propertyCount", "streetsInDistrict", "districtCount"]] \
+            .sort_values(by="propertyCount", ascending=False),
+        'streetsBuilt': df_owner_street_filtered.streetCount.sum(),
+        'districtsBuilt': df_owner_district_filtered.districtCount.sum(),
+        'floorPrice': get_floor_price(listing_index, 'district', district_name),
+        'fullDistrictValue': get_estimated_full_district(df_district),
+        'listings': get_listings(listing_index, 'district', district_name),
+        **get_valuation_summary(df_district)
+    }
+
+def get_city_data(frames, city_name):
+    df = frames['all']
+    df_owner_street = frames['ownerStreet']
+    df_owner_city = frames['ownerCity']
+    listing_index = frames['listings']
+
+    df_city = df.loc[df['city']==city_name]
+    df_owner_street_filtered = df_owner_street.loc[df_owner_street['city']==city_name]
+    df_owner_city_filtered = df_owner_city[df_owner_city['city']==city_name]
+
+    owner_property_counts = df_owner_street_filtered.groupby('ownerAddress').propertyCount.sum()
+    owner_street_counts = df_owner_street_filtered.groupby('ownerAddress').streetCount.sum()
+    df_owner_city_full = pd.merge(pd.merge(df_owner_city_filtered, owner_property_counts, on="ownerAddress"), owner_street_counts, on="ownerAddress")
+    values = {"ownerAddress": df_owner_city_full["ownerAddress"]}
+    df_owner_city_full.fillna(value=values, inplace=True)
+
+    return {
+        'properties': df_city,
+        'districts': df_owner_street_filtered['district'].drop_duplicates().to_list(),
+        'owners': df_owner_city_full[["ownerAddress", "propertyCount", "streetCount", "districtsInCity", "cityCount"]] \
+            .sort_values(by="propertyCount", ascending=False),
+        'streetsBuilt': df_owner_city_full.streetCount.sum(),
+        'districtsBuilt': df_owner_city_full.districtsInCity.sum(),
+        'citiesBuilt': df_owner_city_full.cityCount.sum(),
+        'floorPrice': get_floor_price(listing_index, 'city', city_name),
+        'listings': get_listings(listing_index, 'city', city_name),
+        **get_valuation_summary(df_city)
+    }
+
+def get_wallets_data(frames, wallets):
+    df = frames['all']
+    df_owner_street = frames['ownerStreet']
+
+    df_wallets = df.loc[df['ownerAddress'].isin(wallets)]
+    streets_owned, districts_owned, cities_owned = get_wallet_rollups(df_wallets)
+
+    # Compare each wallet's own holdings against the combined totals
+    df_wallet_summary = df_wallets.groupby('ownerAddress').size().reset_index(name='propertyCount')
+    wallet_street_counts = df_owner_street.loc[df_owner_street['ownerAddress'].isin(wallets)] \
+        .groupby('ownerAddress').streetCount.sum().reset_index(name='streetCount')
+    df_wallet_summary = pd.merge(df_wallet_summary, wallet_street_counts, on='ownerAddress', how='left') \
+        .sort_values(by='propertyCount', ascending=False).reset_index(drop=True)
+
+    df_sorted_listings = frames['listings']['sorted']
+
+    return {
+        'properties': df_wallets,
+        'wallets': df_wallet_summary,
+        'streets': streets_owned,
+        'districts': districts_owned,
+        'cities': cities_owned,
+        'listings': df_sorted_listings.loc[df_sorted_listings['ownerAddress'].isin(wallets)]
+    }
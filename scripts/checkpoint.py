@@ -0,0 +1,96 @@
+import json, os, time
+
+CHECKPOINT_PREFIX = 'crawl-checkpoint/'
+CHECKPOINT_MANIFEST = CHECKPOINT_PREFIX + 'manifest.json'
+CHECKPOINT_PATH = os.environ.get('CHECKPOINT_PATH')
+CHECKPOINT_MAX_AGE = int(os.environ.get('CHECKPOINT_MAX_AGE', str(6 * 60 * 60)))
+# A finished crawl is only reused to retry the steps after it, not to publish old listings
+CHECKPOINT_FINISHED_MAX_AGE = int(os.environ.get('CHECKPOINT_FINISHED_MAX_AGE', str(15 * 60)))
+MANIFEST_FIELDS = ['startedAt', 'finishedAt', 'cursor', 'done', 'chunks']
+
+# A crawl checkpoint is a small manifest with the next cursor, plus one object per chunk of pages
+# saved since the previous checkpoint, keyed by the cursor that fetched each page. Every save only
+# uploads the new chunk and the manifest. Objects live in the bucket under crawl-checkpoint/, or in
+# the CHECKPOINT_PATH directory when it is set.
+
+def read_object(bucket, name):
+    if CHECKPOINT_PATH is not None:
+        path = os.path.join(CHECKPOINT_PATH, name)
+
+        if not os.path.exists(path):
+            return None
+
+        with open(path) as f:
+            return json.load(f)
+
+    blob = bucket.blob(name)
+
+    return json.loads(blob.download_as_bytes()) if blob.exists() else None
+
+def write_object(bucket, name, value):
+    payload = json.dumps(value)
+
+    if CHECKPOINT_PATH is not None:
+        path = os.path.join(CHECKPOINT_PATH, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write then rename so a crash mid-write never leaves a truncated object
+        with open(path + '.tmp', 'w') as f:
+            f.write(payload)
+
+        os.replace(path + '.tmp', path)
+    else:
+        bucket.blob(name).upload_from_string(payload)
+
+def chunk_name(index):
+    return f'{CHECKPOINT_PREFIX}{index}.json'
+
+def new_checkpoint():
+    return {'startedAt': time.time(), 'finishedAt': None, 'cursor': None, 'done': False, 'chunks': 0, 'pages': {}}
+
+def load_checkpoint(bucket):
+    manifest = read_object(bucket, CHECKPOINT_MANIFEST)
+
+    if manifest is None:
+        return new_checkpoint()
+
+    # Listings go stale quickly, so an old crawl is worth less than a fresh one. Manifests saved
+    # before finishedAt existed only know when a finished crawl started.
+    finished_at = manifest.get('finishedAt') or (manifest['startedAt'] if manifest['done'] else None)
+
+    if time.time() - manifest['startedAt'] > CHECKPOINT_MAX_AGE or \
+            (finished_at is not None and time.time() - finished_at > CHECKPOINT_FINISHED_MAX_AGE):
+        print(f"Discarding checkpoint from {time.ctime(manifest['startedAt'])}")
+        clear_checkpoint(bucket)
+        return new_checkpoint()
+
+    # Later chunks win if a page was fetched again after a resume
+    checkpoint = {**new_checkpoint(), **manifest, 'pages': {}}
+
+    for index in range(manifest['chunks']):
+        checkpoint['pages'].update(read_object(bucket, chunk_name(index)))
+
+    print(f"Resuming crawl with {len(checkpoint['pages'])} pages, cursor: {checkpoint['cursor']}")
+
+    return checkpoint
+
+def save_checkpoint(bucket, checkpoint, pages):
+    # pages holds only what was fetched since the last save. The chunk goes first, so a manifest
+    # never points at a chunk that isn't there. A chunk left behind by a failed save is overwritten.
+    if pages:
+        write_object(bucket, chunk_name(checkpoint['chunks']), pages)
+        checkpoint['chunks'] += 1
+
+    write_object(bucket, CHECKPOINT_MANIFEST, {field: checkpoint[field] for field in MANIFEST_FIELDS})
+
+    print(f"Saved checkpoint with {len(checkpoint['pages'])} pages in {checkpoint['chunks']} chunks")
+
+def clear_checkpoint(bucket):
+    if CHECKPOINT_PATH is not None:
+        directory = os.path.join(CHECKPOINT_PATH, CHECKPOINT_PREFIX)
+
+        for name in os.listdir(directory) if os.path.isdir(directory) else []:
+            os.remove(os.path.join(directory, name))
+    else:
+        for blob in bucket.list_blobs(prefix=CHECKPOINT_PREFIX):
+            blob.delete()
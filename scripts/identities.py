@@ -0,0 +1,81 @@
+import json, os
+
+IDENTITIES_BLOB = 'identities.json'
+IDENTITY_COLUMNS = ['address', 'username', 'ensName', 'resolvedAt']
+IDENTITY_TTL = int(os.environ.get('IDENTITY_TTL', str(24 * 60 * 60)))
+IDENTITY_BATCH_SIZE = int(os.environ.get('IDENTITY_BATCH_SIZE', '200'))
+ENS_NAMES_PATH = os.environ.get('ENS_NAMES_PATH')
+
+# One row per owner address, kept apart from properties.json so a wallet's names are stored
+# once rather than on every unit it holds. Usernames come free with each crawl, ENS names are
+# looked up in batches and only re-resolved once they are older than IDENTITY_TTL.
+
+class NullEnsResolver:
+    def resolve(self, addresses):
+        return {address: None for address in addresses}
+
+class LocalEnsResolver:
+    # Stand-in for on-chain reverse resolution, reads address -> name pairs from a JSON file.
+    # Anything with the same resolve(addresses) -> {address: name or None} shape can replace it.
+    def __init__(self, path):
+        with open(path) as f:
+            self.names = {address.lower(): name for address, name in json.load(f).items()}
+
+    def resolve(self, addresses):
+        return {address: self.names.get(address.lower()) for address in addresses}
+
+def get_resolver():
+    return LocalEnsResolver(ENS_NAMES_PATH) if ENS_NAMES_PATH else NullEnsResolver()
+
+def owner_usernames(pages):
+    usernames = {}
+
+    for page in pages:
+        for asset in page:
+            owner = asset.get('owner') or {}
+
+            # Not every asset carries the owner's user, so a name seen on any unit wins
+            if owner.get('address') is not None:
+                usernames[owner['address']] = (owner.get('user') or {}).get('username') or usernames.get(owner['address'])
+
+    return usernames
+
+def load_identities(bucket):
+    blob = bucket.blob(IDENTITIES_BLOB)
+
+    if not blob.exists():
+        return {}
+
+    columns = json.loads(blob.download_as_bytes())
+
+    return {row[0]: dict(zip(IDENTITY_COLUMNS[1:], row[1:])) for row in zip(*(columns[column] for column in IDENTITY_COLUMNS))}
+
+def refresh_identities(identities, usernames, resolver, now):
+    # Only current owners are kept, so wallets that sold out drop off the table
+    refreshed = {}
+
+    for address, username in usernames.items():
+        refreshed[address] = {**identities.get(address, {'ensName': None, 'resolvedAt': 0}), 'username': username}
+
+    stale = [address for address, identity in refreshed.items() if now - identity['resolvedAt'] > IDENTITY_TTL]
+
+    for start in range(0, len(stale), IDENTITY_BATCH_SIZE):
+        for address, name in resolver.resolve(stale[start:start + IDENTITY_BATCH_SIZE]).items():
+            refreshed[address]['ensName'] = name
+            refreshed[address]['resolvedAt'] = now
+
+    print(f"Identities: {len(refreshed)} owners, {len(stale)} resolved")
+
+    return refreshed
+
+def save_identities(bucket, identities):
+    # Column-wise like orders.json
+    columns = {'address': list(identities)}
+
+    for column in IDENTITY_COLUMNS[1:]:
+        columns[column] = [identity[column] for identity in identities.values()]
+
+    payload = json.dumps(columns)
+    bucket.blob(IDENTITIES_BLOB).upload_from_string(payload)
+
+    return payload
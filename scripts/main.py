@@ -1,14 +1,132 @@
-import json, requests, time, os
-from web3 import Web3
+import json, requests, time, os, hashlib, io
+from concurrent.futures import ThreadPoolExecutor
 from google.cloud import storage
+from PIL import Image
 from requests.adapters import HTTPAdapter, Retry
+from normalize import normalize_pages
+from snapshot_diff import diff_snapshots, get_sinks, publish
+from checkpoint import load_checkpoint, save_checkpoint, clear_checkpoint
+from identities import owner_usernames, load_identities, refresh_identities, save_identities, get_resolver
+
+BUCKET_NAME = 'propertys-opensea'
+THUMBNAIL_PREFIX = 'thumbnails/'
+THUMBNAIL_CACHE_CONTROL = 'public, max-age=604800'
+THUMBNAIL_WORKERS = 16
+# Reports show images 250px wide
+THUMBNAIL_SIZE = 250
+NORMALIZE_WORKERS = int(os.environ.get('NORMALIZE_WORKERS', '1'))
+CHECKPOINT_EVERY = int(os.environ.get('CHECKPOINT_EVERY', '20'))
+# Stop crawling and leave the rest for the next invocation well before the function times out
+CRAWL_TIME_LIMIT = int(os.environ.get('CRAWL_TIME_LIMIT', '420'))
+
+# There are some errant images for Beige Bay that say "Pidgeon Park" instead of "Pigeon Park"
+BAD_IMAGE_URLS = {
+    'https://lh3.googleusercontent.com/5wlasmr-xFirlE2SX2rmnCg3A88Hu2El5k9LzptwMhlhFsmsxe_VdtHIencLJp7iB7gedQohOXyZ_Ts6G7aHByR-a9GOsay1Z-7m7g'
+}
+
+def replace_bad_images(properties):
+    # Swap known-bad images for a good one from the same street so reports never have to filter them
+    good_images = {}
+
+    for property in properties:
+        if property['imageUrl'] not in BAD_IMAGE_URLS:
+            good_images.setdefault(property.get('street'), property)
+
+    for property in properties:
+        # Without a good image on the street, keep the bad one rather than leave the report without an image
+        if property['imageUrl'] in BAD_IMAGE_URLS and property.get('street') in good_images:
+            replacement = good_images[property['street']]
+
+            for key in ['imageUrl', 'imagePreviewUrl', 'imageThumbnailUrl']:
+                property[key] = replacement.get(key)
+
+def resize_thumbnail(content):
+    # Falls back to the original bytes for anything Pillow can't decode
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+            output = io.BytesIO()
+            image.save(output, format='PNG', optimize=True)
+    except (OSError, ValueError) as e:
+        print(f"Failed to resize thumbnail: {e}")
+        return content, None
+
+    return output.getvalue(), 'image/png'
+
+def attach_thumbnails(bucket, properties):
+    # Points units at thumbnails already in the bucket and returns the source images still missing.
+    # Units on the same street share artwork, so each source image is only listed once.
+    source_urls = {}
+    blob_names = {}
+
+    for property in properties:
+        source_url = property.get('imagePreviewUrl') or property.get('imageThumbnailUrl')
+
+        if source_url is not None:
+            # The size is part of the name so changing it doesn't reuse thumbnails cached at the old size
+            blob_name = THUMBNAIL_PREFIX + hashlib.sha1(f'{source_url}@{THUMBNAIL_SIZE}'.encode('utf-8')).hexdigest()
+            source_urls[blob_name] = source_url
+            blob_names[property['tokenId']] = blob_name
+
+    existing = {blob.name for blob in bucket.list_blobs(prefix=THUMBNAIL_PREFIX)}
+
+    # Only point at thumbnails that are in the bucket, the app falls back to imageUrl otherwise
+    for property in properties:
+        blob_name = blob_names.get(property['tokenId'])
+
+        if blob_name in existing:
+            property['thumbnailUrl'] = f'https://storage.googleapis.com/{BUCKET_NAME}/{blob_name}'
+
+    missing = [(name, url) for name, url in source_urls.items() if name not in existing]
+    print(f"Thumbnails: {len(source_urls)} total, {len(existing)} cached, {len(missing)} missing")
+
+    return missing
+
+def fetch_thumbnails(session, bucket, missing):
+    # Runs after the snapshot is stored, units pick up the new thumbnails on the next run
+    def fetch(item):
+        blob_name, source_url = item
+
+        # Thumbnails are optional, so any failure here just leaves the unit on imageUrl
+        try:
+            (r := session.get(source_url, timeout=30)).raise_for_status()
+            content, content_type = resize_thumbnail(r.content)
+
+            blob = bucket.blob(blob_name)
+            blob.cache_control = THUMBNAIL_CACHE_CONTROL
+            blob.upload_from_string(content, content_type=content_type or r.headers.get('content-type', 'image/png'))
+        except Exception as e:
+            print(f"Failed to cache thumbnail {source_url}: {type(e).__name__} {e}")
+            return None
+
+        return blob_name
+
+    with ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS) as executor:
+        fetched = [name for name in executor.map(fetch, missing) if name is not None]
+
+    print(f"Thumbnails: {len(fetched)} of {len(missing)} fetched")
+
+def write_manifest(bucket, payloads, checkpoint):
+    # Written after every other blob, the app only switches snapshots once the hashes here match
+    # what it reads back. The version uses the same formula as report_data.get_snapshot_version.
+    hashes = {name: hashlib.sha1(payloads[name].encode('utf-8')).hexdigest() for name in ['properties', 'orders', 'identities']}
+    version = hashlib.sha1(','.join(hashes.values()).encode('utf-8')).hexdigest()
+
+    # The crawl times say how old the listings are, which can be older than updatedAt after a retry
+    bucket.blob('snapshot.json').upload_from_string(json.dumps({
+        'version': version,
+        'updatedAt': time.time(),
+        'crawlStartedAt': checkpoint['startedAt'],
+        'crawlFinishedAt': checkpoint['finishedAt'],
+        'hashes': hashes
+    }))
 
 def run(event, context):
-    data = {'assets': []}
+    data = {'pages': []}
     properties = []
 
     def main():
-        OS_BASE_URL = 'https://api.opensea.io/api/v1/assets'
+        OS_BASE_URL = os.environ.get('OPEN_SEA_BASE_URL', 'https://api.opensea.io') + '/api/v1/assets'
         API_KEY = os.environ.get('OPEN_SEA_API_KEY', 'Specified environment variable is not set.')
 
         params = {
@@ -23,7 +141,7 @@ def run(event, context):
         }
 
         storage_client = storage.Client()
-        bucket = storage_client.bucket('propertys-opensea')
+        bucket = storage_client.bucket(BUCKET_NAME)
         blob = bucket.blob('properties.json')
 
         with requests.Session() as session:
@@ -35,64 +153,103 @@ def run(event, context):
 
             session.mount(OS_BASE_URL, HTTPAdapter(max_retries=retry))
 
-            while True:
+            checkpoint = load_checkpoint(bucket)
+            pages = checkpoint['pages']
+            unsaved = {}
+            crawl_started = time.time()
+
+            if checkpoint['cursor'] is not None:
+                params['cursor'] = checkpoint['cursor']
+
+            while not checkpoint['done']:
+                # Pages are keyed by the cursor that fetched them, so refetching one after a resume replaces it
+                page_key = params.get('cursor', '')
+
                 print(f"Making request with params: {params}")
-                (r := session.get(OS_BASE_URL, params=params, headers=headers)).raise_for_status()
+
+                try:
+                    (r := session.get(OS_BASE_URL, params=params, headers=headers)).raise_for_status()
+                except requests.RequestException:
+                    save_checkpoint(bucket, checkpoint, unsaved)
+                    raise
+
                 print(r.status_code)
                 response_json = r.json()
-                data['assets'].extend(response_json['assets'])
+                pages[page_key] = unsaved[page_key] = response_json['assets']
 
                 if (cursor := response_json['next']):
                     print(f"Next cursor: {cursor}")
-                    params['cursor'] = cursor
+                    params['cursor'] = checkpoint['cursor'] = cursor
                 else:
-                    break
+                    checkpoint['cursor'] = None
+                    checkpoint['done'] = True
+                    checkpoint['finishedAt'] = time.time()
+
+                timed_out = not checkpoint['done'] and time.time() - crawl_started > CRAWL_TIME_LIMIT
+
+                # Each save uploads only the pages since the last one
+                if checkpoint['done'] or timed_out or len(unsaved) >= CHECKPOINT_EVERY:
+                    save_checkpoint(bucket, checkpoint, unsaved)
+                    unsaved = {}
+
+                if timed_out:
+                    print(f"Crawl time limit reached after {len(pages)} pages, resuming on the next run")
+                    return
+
+        # Assets can shift between pages while a crawl is spread over several runs, keep the latest copy of each
+        seen = set()
+
+        for page in reversed(list(pages.values())):
+            data['pages'].insert(0, [asset for asset in page if asset['token_id'] not in seen])
+            seen.update(asset['token_id'] for asset in page)
 
         now = time.time()
 
-        for asset in data['assets']:
-            property = {
-                'tokenId': asset['token_id'],
-                'numSales': asset['num_sales'],
-                'imageUrl': asset['image_url'],
-                'imagePreviewUrl': asset['image_preview_url'],
-                'imageThumbnailUrl': asset['image_thumbnail_url'],
-                'name': asset['name'],
-                'osLink': asset['permalink'],
-                'lastSale': asset['last_sale'],
-                'ownerAddress': asset['owner']['address']
-            }
-
-            if asset['owner']['user'] is not None:
-                property['ownerName'] = asset['owner']['user']['username']
-
-            if asset['last_sale'] is not None:
-                property['lastSale'] = str(Web3.fromWei(int(asset['last_sale']['total_price']), 'ether'))
-
-            if asset['seaport_sell_orders'] is not None:
-                property['salePrice'] = str(Web3.fromWei(int(asset['seaport_sell_orders'][0]['current_price']), 'ether'))
-                property['saleType'] = asset['seaport_sell_orders'][0]['sale_type']
-
-            for trait in asset['traits']:
-                if trait['trait_type'] == 'City Name':
-                    property['city'] = trait['value'].strip()
-                if trait['trait_type'] == 'District Name':
-                    property['district'] = trait['value'].strip()
-                if trait['trait_type'] == 'Street Name':
-                    property['street'] = trait['value'].strip()
-                if trait['trait_type'] == 'Unit':
-                    property['unit'] = trait['value']
-                if trait['trait_type'] == 'Special':
-                    property['city'] = 'Special'
-                    property['district'] = 'Special'
-                    property['street'] = trait['value'].strip()
-            
-            properties.append(property)
-        
+        normalized, orders, rejected = normalize_pages(data['pages'], workers=NORMALIZE_WORKERS)
+        properties.extend(normalized)
+
+        if rejected:
+            print(f"Rejected {len(rejected)} assets or orders: {rejected[:10]}")
+
+        bucket.blob('rejected.json').upload_from_string(json.dumps(rejected))
+
+        identities = refresh_identities(load_identities(bucket), owner_usernames(data['pages']), get_resolver(), time.time())
+
+        replace_bad_images(properties)
+        missing_thumbnails = attach_thumbnails(bucket, properties)
+
+        # Diff against the previous snapshot before it gets overwritten
+        hashes_blob = bucket.blob('properties-hashes.json')
+
+        if blob.exists():
+            previous = json.loads(blob.download_as_bytes())
+            previous_hashes = json.loads(hashes_blob.download_as_bytes()) if hashes_blob.exists() else None
+            events, hashes = diff_snapshots(previous, properties, previous_hashes)
+        else:
+            # Nothing to compare the first snapshot against, so there is nothing to announce
+            _, hashes = diff_snapshots([], properties)
+            events = []
+
         time_taken = time.time() - now
 
-        blob.upload_from_string(json.dumps(properties))
+        payloads = {'properties': json.dumps(properties), 'orders': json.dumps(orders)}
+
+        bucket.blob('orders.json').upload_from_string(payloads['orders'])
+        payloads['identities'] = save_identities(bucket, identities)
+        blob.upload_from_string(payloads['properties'])
+        hashes_blob.upload_from_string(json.dumps(hashes))
+        write_manifest(bucket, payloads, checkpoint)
+
+        # Only once the snapshot they describe is stored, otherwise a failed upload sends them again next run
+        publish(events, get_sinks())
+
+        clear_checkpoint(bucket)
 
         print(time_taken)
 
+        # Last, so a slow or failing image host can't hold up or lose the snapshot
+        with requests.Session() as image_session:
+            image_session.mount('https://', HTTPAdapter(max_retries=Retry(total=3, backoff_factor=0.1), pool_maxsize=THUMBNAIL_WORKERS))
+            fetch_thumbnails(image_session, bucket, missing_thumbnails)
+
     main()
\ No newline at end of file
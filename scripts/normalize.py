@@ -0,0 +1,186 @@
+import sys, time
+from decimal import Decimal, localcontext
+from concurrent.futures import ProcessPoolExecutor
+
+CITY_NAMES = {
+    'Beige Bay',
+    'Orange Oasis',
+    'Yellow Yards',
+    'Green Grove',
+    'Purple Palms',
+    'Blue Bayside',
+    'X AE X-II',
+    'Special'
+}
+
+REQUIRED_FIELDS = ['tokenId', 'ownerAddress', 'city', 'district', 'street']
+INTERNED_FIELDS = ['city', 'district', 'street', 'saleType']
+
+WEI_PER_ETH = Decimal(10**18)
+
+ORDER_COLUMNS = ['tokenId', 'side', 'saleType', 'price', 'expiry']
+
+def set_city(property, value):
+    property['city'] = value.strip()
+
+def set_district(property, value):
+    property['district'] = value.strip()
+
+def set_street(property, value):
+    property['street'] = value.strip()
+
+def set_unit(property, value):
+    property['unit'] = value
+
+def set_special(property, value):
+    property['city'] = 'Special'
+    property['district'] = 'Special'
+    property['street'] = value.strip()
+
+TRAIT_HANDLERS = {
+    'City Name': set_city,
+    'District Name': set_district,
+    'Street Name': set_street,
+    'Unit': set_unit,
+    'Special': set_special
+}
+
+def wei_to_eth(values):
+    # Same precision as Web3.fromWei, but one decimal context for the whole batch.
+    # Wei amounts overflow 64-bit integers, so this stays on Python ints rather than numpy.
+    with localcontext() as ctx:
+        ctx.prec = 999
+        return [str(Decimal(int(value)) / WEI_PER_ETH) for value in values]
+
+def parse_wei(value):
+    # OpenSea sometimes formats wei with a decimal part, e.g. "1000000000000000000.0000"
+    return int(Decimal(value))
+
+def order_rows(token_id, asset):
+    # Keep every sell order plus any offers included with the asset, not just the first listing.
+    # Each order is parsed on its own, so a bad one is skipped without losing the unit.
+    rows = []
+    skipped = []
+
+    for side, key in [('ask', 'seaport_sell_orders'), ('bid', 'seaport_buy_orders')]:
+        for order in asset.get(key) or []:
+            try:
+                rows.append((token_id, side, order.get('sale_type'), parse_wei(order['current_price']), int(order.get('expiration_time') or 0)))
+            except (KeyError, TypeError, ValueError, AttributeError, ArithmeticError) as e:
+                skipped.append({'tokenId': token_id, 'reason': f'skipped {side} order: {type(e).__name__} {e}'})
+
+    return rows, skipped
+
+def validate(property):
+    for field in REQUIRED_FIELDS:
+        if property.get(field) is None:
+            return f'missing {field}'
+
+    if property['city'] not in CITY_NAMES:
+        return f"unknown city {property['city']}"
+
+    return None
+
+def parse_asset(asset, now):
+    # Raises on anything malformed, normalize_page turns that into a rejected row
+    property = {
+        'tokenId': asset['token_id'],
+        'numSales': asset['num_sales'],
+        'imageUrl': asset['image_url'],
+        'imagePreviewUrl': asset['image_preview_url'],
+        'imageThumbnailUrl': asset['image_thumbnail_url'],
+        'name': asset['name'],
+        'osLink': asset['permalink'],
+        'lastSale': None,
+        'ownerAddress': asset['owner']['address']
+    }
+
+    last_sale = parse_wei(asset['last_sale']['total_price']) if asset['last_sale'] is not None else None
+    orders, skipped = order_rows(property['tokenId'], asset)
+    sale_price = None
+
+    # The listing is the cheapest live basic ask, or the cheapest live auction if there is no basic one.
+    # OpenSea doesn't sort the sell orders, so the first one isn't necessarily the floor.
+    asks = [order for order in orders if order[1] == 'ask' and (not order[4] or order[4] > now)]
+    asks = [order for order in asks if order[2] == 'basic'] or asks
+
+    if asks:
+        best_ask = min(asks, key=lambda order: order[3])
+        sale_price = best_ask[3]
+        property['saleType'] = best_ask[2]
+
+    for trait in asset['traits']:
+        handler = TRAIT_HANDLERS.get(trait['trait_type'])
+
+        if handler is not None:
+            handler(property, trait['value'])
+
+    return property, last_sale, sale_price, orders, skipped
+
+def normalize_page(assets):
+    properties = []
+    orders = []
+    rejected = []
+    last_sale_rows = []
+    sale_price_rows = []
+    now = time.time()
+
+    for asset in assets:
+        try:
+            property, last_sale, sale_price, asset_orders, skipped = parse_asset(asset, now)
+        except (KeyError, TypeError, ValueError, AttributeError, ArithmeticError) as e:
+            token_id = asset.get('token_id') if isinstance(asset, dict) else None
+            rejected.append({'tokenId': token_id, 'reason': f'malformed asset: {type(e).__name__} {e}'})
+            continue
+
+        if (reason := validate(property)) is not None:
+            rejected.append({'tokenId': property['tokenId'], 'reason': reason})
+            continue
+
+        if last_sale is not None:
+            last_sale_rows.append((property, last_sale))
+        if sale_price is not None:
+            sale_price_rows.append((property, sale_price))
+
+        properties.append(property)
+        orders.extend(asset_orders)
+
+        # Reported alongside rejected assets, but the unit itself is kept
+        rejected.extend(skipped)
+
+    # Convert prices for the whole page at once
+    for key, rows in [('lastSale', last_sale_rows), ('salePrice', sale_price_rows)]:
+        for (property, _), value in zip(rows, wei_to_eth(value for _, value in rows)):
+            property[key] = value
+
+    order_prices = wei_to_eth(order[3] for order in orders)
+    orders = [(*order[:3], float(price), order[4]) for order, price in zip(orders, order_prices)]
+
+    return properties, orders, rejected
+
+def normalize_pages(pages, workers=1):
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(normalize_page, pages))
+    else:
+        results = [normalize_page(page) for page in pages]
+
+    properties = []
+    orders = {column: [] for column in ORDER_COLUMNS}
+    rejected = []
+
+    for page_properties, page_orders, page_rejected in results:
+        for property in page_properties:
+            # Names repeat across thousands of units, share one string object per value
+            for field in INTERNED_FIELDS:
+                if isinstance(property.get(field), str):
+                    property[field] = sys.intern(property[field])
+
+        properties.extend(page_properties)
+        rejected.extend(page_rejected)
+
+        # Orders are stored column-wise so the table stays compact no matter how many each token has
+        for column, values in zip(ORDER_COLUMNS, zip(*page_orders)):
+            orders[column].extend(values)
+
+    return properties, orders, rejected
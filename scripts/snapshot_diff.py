@@ -0,0 +1,139 @@
+import json, hashlib, os, requests
+from collections import Counter, defaultdict
+
+TRANSFER = 'transfer'
+NEW_LISTING = 'new_listing'
+DELISTING = 'delisting'
+PRICE_CHANGE = 'price_change'
+STREET_COMPLETED = 'street_completed'
+DISTRICT_COMPLETED = 'district_completed'
+CITY_COMPLETED = 'city_completed'
+
+def row_hash(property):
+    return hashlib.sha1(json.dumps(property, sort_keys=True).encode('utf-8')).hexdigest()
+
+def snapshot_hashes(properties):
+    return {property['tokenId']: row_hash(property) for property in properties}
+
+def rollup(rows):
+    # Same street -> district -> city rules as the app's get_data_frames
+    street_units = Counter((row['city'], row['district'], row['street']) for row in rows)
+    streets = {key: count // 7 for key, count in street_units.items()}
+
+    district_streets = Counter()
+    for (city, district, _), count in streets.items():
+        district_streets[(city, district)] += count
+    districts = {key: count // 3 for key, count in district_streets.items()}
+
+    city_districts = Counter()
+    for (city, _), count in districts.items():
+        city_districts[city] += count
+    cities = {key: count // 3 for key, count in city_districts.items()}
+
+    return {STREET_COMPLETED: streets, DISTRICT_COMPLETED: districts, CITY_COMPLETED: cities}
+
+def listing_events(token_id, old, new):
+    old_price = old.get('salePrice') if old is not None else None
+    new_price = new.get('salePrice') if new is not None else None
+
+    if old_price is None and new_price is not None:
+        return [{'type': NEW_LISTING, 'tokenId': token_id, 'salePrice': new_price, 'saleType': new.get('saleType')}]
+    if old_price is not None and new_price is None:
+        return [{'type': DELISTING, 'tokenId': token_id, 'salePrice': old_price}]
+    if old_price is not None and old_price != new_price:
+        return [{'type': PRICE_CHANGE, 'tokenId': token_id, 'oldPrice': old_price, 'salePrice': new_price}]
+
+    return []
+
+def completion_events(owners, old_properties, new_properties):
+    # Only the owners touched by a transfer can have completed anything new
+    old_rows = defaultdict(list)
+    new_rows = defaultdict(list)
+
+    for rows, properties in [(old_rows, old_properties), (new_rows, new_properties)]:
+        for property in properties:
+            if property['ownerAddress'] in owners:
+                rows[property['ownerAddress']].append(property)
+
+    events = []
+
+    for owner in sorted(owners):
+        before = rollup(old_rows[owner])
+        after = rollup(new_rows[owner])
+
+        for event_type, counts in after.items():
+            for key, count in counts.items():
+                if count > before[event_type].get(key, 0):
+                    location = dict(zip(['city', 'district', 'street'], key if isinstance(key, tuple) else (key,)))
+                    events.append({'type': event_type, 'ownerAddress': owner, 'count': count, **location})
+
+    return events
+
+def diff_snapshots(old_properties, new_properties, old_hashes=None):
+    if old_hashes is None:
+        old_hashes = snapshot_hashes(old_properties)
+
+    new_hashes = snapshot_hashes(new_properties)
+    changed = {token_id for token_id, digest in new_hashes.items() if old_hashes.get(token_id) != digest}
+    changed.update(token_id for token_id in old_hashes if token_id not in new_hashes)
+
+    old_by_token = {property['tokenId']: property for property in old_properties if property['tokenId'] in changed}
+    new_by_token = {property['tokenId']: property for property in new_properties if property['tokenId'] in changed}
+
+    events = []
+    owners = set()
+
+    for token_id in sorted(changed):
+        old = old_by_token.get(token_id)
+        new = new_by_token.get(token_id)
+
+        if old is not None and new is not None and old['ownerAddress'] != new['ownerAddress']:
+            events.append({'type': TRANSFER, 'tokenId': token_id, 'from': old['ownerAddress'], 'to': new['ownerAddress']})
+            owners.add(new['ownerAddress'])
+
+        events.extend(listing_events(token_id, old, new))
+
+    if owners:
+        events.extend(completion_events(owners, old_properties, new_properties))
+
+    return events, new_hashes
+
+class FileSink:
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, events):
+        with open(self.path, 'a') as f:
+            for event in events:
+                f.write(json.dumps(event) + '\n')
+
+class WebhookSink:
+    def __init__(self, url, session=None):
+        self.url = url
+        self.session = session or requests.Session()
+
+    def send(self, events):
+        # Stub delivery: one POST per run, receivers are expected to fan out themselves
+        try:
+            self.session.post(self.url, json={'events': events}, timeout=10).raise_for_status()
+        except requests.RequestException as e:
+            print(f"Failed to deliver {len(events)} events to {self.url}: {e}")
+
+def get_sinks():
+    sinks = []
+
+    if (path := os.environ.get('EVENTS_FILE')):
+        sinks.append(FileSink(path))
+    if (url := os.environ.get('EVENTS_WEBHOOK_URL')):
+        sinks.append(WebhookSink(url))
+
+    return sinks
+
+def publish(events, sinks):
+    if not events:
+        return
+
+    print(f"Publishing {len(events)} change events: {dict(Counter(event['type'] for event in events))}")
+
+    for sink in sinks:
+        sink.send(events)
@@ -1,8 +1,10 @@
 import datetime, random
 import streamlit as st
-import pandas as pd
-import numpy as np
 from streamlit_echarts import st_echarts
+from report_data import (
+    PROP_BRIX_DICT, SPECIAL_BRIX_DICT, get_snapshot, get_order_depth, get_image_urls, parse_wallets, with_owner_names, resolve_owner,
+    get_overview_data, get_street_data, get_district_data, get_city_data, get_wallets_data
+)
 
 # Setup config and sidebar
 st.set_page_config(
@@ -147,113 +149,13 @@ WETH_PAYMENT_TOKEN = '0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2'
 PARAMS_DICT = {
     'overview': [],
     'owner': ['owner'],
+    'wallets': ['wallets'],
     'street': ['street'],
     'district': ['district']
 }
 
-PROP_BRIX_DICT = {
-    'Beige Bay': {'house': 10, 'street': 370, 'district': 1610, 'city': 9050},
-    'Orange Oasis': {'house': 20, 'street': 490, 'district': 2070, 'city': 11550},
-    'Yellow Yards': {'house': 30, 'street': 610, 'district': 2530, 'city': 11520},
-    'Green Grove': {'house': 40, 'street': 730, 'district': 2640, 'city': 13560},
-    'Purple Palms': {'house': 50, 'street': 850, 'district': 3450, 'city': 15600},
-    'Blue Bayside': {'house': 60, 'street': 970, 'district': 3910, 'city': 13730},
-    'X AE X-II': {'house': 80, 'street': 1210, 'district': 5230, 'city': 19990}
-}
-
-SPECIAL_BRIX_DICT = {
-    'Casa Blanca': 250,
-    'Mystical Rocks': 250,
-    'Spiky Singers': 250,
-    'The Guardian': 250,
-    'Candy Castle': 600,
-    'Cathedral of Wisdom': 600,
-    'Palace of Eternity': 600,
-    "Peter's Great Wall": 600,
-    "Property's Stadium": 600,
-    'The Impossible Bridge': 600,
-    'Ancient Labyrinth': 1200,
-    'Fort in the Leaves': 1200,
-    'Great Temple of Peter': 1200,
-    'Le Tower': 1200,
-    'Mount Proper': 1200,
-    'Question Cat': 1200,
-    'The Emperors Arena': 1200,
-    'The Money Pool': 1200,
-    'The Secret Glass Pyramid': 1200,
-    'The Sunken City': 1200
-}
-
-#@st.cache_data(ttl=300)
-def load_data():
-    # df = pd.read_json(
-    #     'gcs://propertys-opensea/properties.json',
-    #     storage_options={'token': st.secrets['gcp_service_account']}
-    # )
-
-    df = pd.read_json(
-        'gcs://propertys-opensea/properties.json',
-        storage_options={'token': 'anon'}
-    )
-    
-    # values = {"ownerName": df['ownerAddress']}
-    # df.fillna(value=values, inplace=True)
-
-    # Add a lowercased owner name column for easier lookups
-    # df['ownerNameLower'] = df['ownerName'].str.lower()
-
-    return df
-
-df = load_data()
-
-#@st.cache_data(ttl=60)
-def get_data_frames():
-    df_simple = df[['ownerAddress', 'city', 'district', 'street', 'numSales', 'lastSale', 'salePrice']]
-
-    # TODO: Figure out a more efficient way to do this
-    # Street level grouping
-    gb_owner_street = df.groupby(['ownerAddress', 'city', 'district', 'street'], dropna=False)
-    df_owner_street = gb_owner_street.size().reset_index(name='propertyCount')
-    df_owner_street['streetCount'] = np.floor_divide(df_owner_street['propertyCount'], 7)
-
-    # District level grouping
-    gb_owner_district = df_owner_street.groupby(['ownerAddress', 'city', 'district'], dropna=False)
-    df_owner_district = gb_owner_district.streetCount.agg(sum).reset_index(name='streetsInDistrict')
-    df_owner_district['districtCount'] = np.floor_divide(df_owner_district['streetsInDistrict'], 3)
-
-    # City level grouping
-    gb_owner_city = df_owner_district.groupby(['ownerAddress', 'city'], dropna=False)
-    df_owner_city = gb_owner_city.districtCount.agg(sum).reset_index(name='districtsInCity')
-    df_owner_city['cityCount'] = np.floor_divide(df_owner_city['districtsInCity'], 3)   
-
-    # Create top 10 dataframes (not worth doing City owners yet)
-    df_top_owners = df.groupby(['ownerAddress'], dropna=False) \
-        .size().reset_index(name='count').sort_values(by='count', ascending=False).head(10)
-    df_top_owners.index = pd.RangeIndex(start=1, stop=11, step=1)
-
-    df_top_street_owners = df_owner_street.groupby(['ownerAddress'], dropna=False) \
-        .streetCount.agg(sum).reset_index(name='count').sort_values(by='count', ascending=False).head(10)
-    df_top_street_owners.index = pd.RangeIndex(start=1, stop=11, step=1)
-
-    df_top_district_owners = df_owner_district.groupby(['ownerAddress'], dropna=False) \
-        .districtCount.agg(sum).reset_index(name='count').sort_values(by='count', ascending=False).head(10)
-    df_top_district_owners.index = pd.RangeIndex(start=1, stop=11, step=1)
-
-    df_top_city_owners = df_owner_city.groupby(['ownerAddress'], dropna=False) \
-        .cityCount.agg(sum).reset_index(name='count').sort_values(by='count', ascending=False).head(10)
-    df_top_city_owners.index = pd.RangeIndex(start=1, stop=11, step=1)
-
-    return {
-        'all': df,
-        'simple': df_simple,
-        'ownerStreet': df_owner_street,
-        'ownerDistrict': df_owner_district,
-        'ownerCity': df_owner_city,
-        'topOwners': df_top_owners,
-        'topStreetOwners': df_top_street_owners,
-        'topDistrictOwners': df_top_district_owners,
-        'topCityOwners': df_top_city_owners.loc[df_top_city_owners['count']>0]
-    }
+snapshot = get_snapshot()
+df = snapshot['frames']['all']
 
 def make_clickable(url, text):
     return f'<a target="_blank" href="{url}">{text}</a>'
@@ -261,69 +163,64 @@ def make_clickable(url, text):
 def render_overview():
     st.title('Overview')
 
-    frames = get_data_frames()
-
-    df_buy_now_properties = df.where((df['salePrice'] > 0) & (df['saleType'] == 'basic'))
-    df_available_streets = df_buy_now_properties.groupby(['city', 'district', 'street'])['salePrice'] \
-            .apply(lambda x: x.sort_values().head(7).sum() if x.count() > 6 else None) \
-            .to_frame().dropna().sort_values(by='salePrice').reset_index()
+    overview = get_overview_data(snapshot['frames'])
+    identities = snapshot['frames']['identities']
 
-    if (len(df_available_streets) > 0):
-        df_available_streets = df_available_streets[df_available_streets.city != 'Special']
-        df_available_streets['brixYield'] = df_available_streets \
-            .apply(lambda x: PROP_BRIX_DICT[str(x['city']).strip()]['street'], axis=1)
-        df_available_streets['brix/eth'] = df_available_streets['brixYield'] / df_available_streets['salePrice']
-        df_available_streets = df_available_streets.round({'salePrice': 2, 'brix/eth': 2})
-    
     with st.container():
         col1, col2, col3, col4 = st.columns(4)
 
-        num_streets = frames['ownerStreet'].streetCount.sum()
-        num_districts = frames['ownerDistrict'].districtCount.sum()
-        num_cities = frames['ownerCity'].cityCount.sum()
-
         with col1:
-            st.metric(label='Unique Owners', value=f"👥 {len(df.groupby('ownerAddress'))}")
+            st.metric(label='Unique Owners', value=f"👥 {overview['uniqueOwners']}")
         with col2:
-            st.metric(label='Pure Streets', value=f"🛣️ {num_streets} / 840")
+            st.metric(label='Pure Streets', value=f"🛣️ {overview['streets']} / 840")
         with col3:
-            st.metric(label='Districts', value=f"🏘️ {num_districts} / 280")
+            st.metric(label='Districts', value=f"🏘️ {overview['districts']} / 280")
         with col4:
-            st.metric(label="Cities", value=f"🏙️ {num_cities} / 70")
+            st.metric(label="Cities", value=f"🏙️ {overview['cities']} / 70")
 
     with st.container():
         col1, col2, col3, col4 = st.columns(4)
 
         with col1:
             st.subheader('Top Property Owners')
-            st.table(frames['topOwners'][['ownerAddress','count']])
+            st.table(with_owner_names(overview['topOwners'], identities)[['ownerName', 'count']])
         with col2:
             st.subheader('Top Street Owners')
-            st.table(frames['topStreetOwners'][['ownerAddress', 'count']])
+            st.table(with_owner_names(overview['topStreetOwners'], identities)[['ownerName', 'count']])
         with col3:
             st.subheader('Top District Owners')
-            st.table(frames['topDistrictOwners'][['ownerAddress', 'count']])
+            st.table(with_owner_names(overview['topDistrictOwners'], identities)[['ownerName', 'count']])
         with col4:
             st.subheader('Top City Owners')
-            st.table(frames['topCityOwners'][['ownerAddress', 'count']])
+            st.table(with_owner_names(overview['topCityOwners'], identities)[['ownerName', 'count']])
     
     with st.container():
         col1, col2 = st.columns(2)
 
         with col1:
             st.subheader('🏷️ Cheapest Streets')
-            if len(df_available_streets) > 0:
-                st.table(df_available_streets[['city', 'district', 'street', 'salePrice', 'brix/eth']].head(10))
+            if len(overview['cheapestStreets']) > 0:
+                st.table(overview['cheapestStreets'])
             else:
                 st.subheader('No full streets listed!')
 
         with col2:
             st.subheader('🧱 Best BRIX Value Streets')
-            if len(df_available_streets) > 0:
-                st.table(df_available_streets[['city', 'district', 'street', 'salePrice', 'brix/eth']].sort_values(by='brix/eth', ascending=False).head(10))
+            if len(overview['bestValueStreets']) > 0:
+                st.table(overview['bestValueStreets'])
             else:
                 st.subheader('No full streets listed!')
 
+    with st.container():
+        st.subheader(f"💎 Listed Below Estimate ({overview['belowEstimateCount']})")
+
+        if overview['belowEstimateCount'] > 0:
+            below_estimate = overview['belowEstimateListings'].copy()
+            below_estimate['osLink'] = below_estimate['osLink'].apply(make_clickable, args=('View on OpenSea',))
+            st.write(below_estimate.to_html(escape=False, render_links=True, index=False), unsafe_allow_html=True)
+        else:
+            st.subheader('No listings below their estimated value!')
+
     with st.container():
         st.subheader('Release Notes')
 
@@ -423,135 +320,175 @@ def render_overview():
             )
 
 
+def render_order_book(order_book, level, name):
+    asks = get_order_depth(order_book, 'ask', level, name)
+    bids = get_order_depth(order_book, 'bid', level, name)
+
+    with st.container():
+        st.subheader('📈 Order Book')
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.metric(label='Best Ask', value=f"Ξ {asks['price'].iat[0]}" if len(asks) > 0 else 'N/A')
+            st.write(asks[['street', 'saleType', 'price']].reset_index(drop=True))
+        with col2:
+            st.metric(label='Best Bid', value=f"Ξ {bids['price'].iat[0]}" if len(bids) > 0 else 'N/A')
+            st.write(bids[['street', 'price']].reset_index(drop=True))
+
+def render_holdings(df_owner, listings, streets_owned, districts_owned, cities_owned):
+    listings = listings.fillna('Mint')
+
+    # Create a radial plot of the owner's properties by city
+    df_owner_cities = df_owner.groupby('city').size().reset_index(name='count')
+    df_owner_cities.rename(columns={'city': 'name', 'count': 'value'}, inplace=True)
+
+    COLOR_MAP = {
+        'Beige Bay': '#D6C58D',
+        'Orange Oasis': '#DF9F30',
+        'Yellow Yards': '#E8D322',
+        'Green Grove': '#00AB78',
+        'Purple Palms': '#8F00FF',
+        'Blue Bayside': '#2F5BAC',
+        'X AE X-II': '#FF0500',
+        'Special': '#808080'
+    }
+
+    colors = []
+
+    # Set the color array for each city in the result
+    owner_dict = df_owner_cities[['name', 'value']].to_dict(orient='records')
+
+    for row in owner_dict:
+        colors.append(COLOR_MAP[row['name'].strip()])   
+
+    pie_chart_options = {
+        'title': {'text': 'Holdings by City', 'left': 'center'},
+        'tooltip': {'trigger': 'item'},
+        'legend': None,
+        'series': [
+            {
+                'name': 'Properties Owned',
+                'type': 'pie',
+                'color': colors,
+                'radius': '50%',
+                'data': df_owner_cities[['name', 'value']].to_dict(orient='records'),
+                'emphasis': {
+                    'itemStyle': {
+                        'shadowBlur': 10,
+                        'shadowOffsetX': 0,
+                        'shadowColor': 'rgba(0,0,0,0.5)'
+                    }
+                }
+            }
+        ],
+        'grid': {
+            'left': 0,
+            'top': 0,
+            'right': 0,
+            'bottom': 0
+        }
+    }
+
+    with st.container():
+        col1, col2, col3, col4 = st.columns([1,1,2,2])
+    
+        with col1:
+            image_url = get_image_urls(df_owner).sample().values[0]
+            st.image(image_url, width=250, caption='Holding Highlight')  
+        with col2:
+            st.metric(label='Properties Owned', value=f"🏠 {len(df_owner)}")
+            st.metric(label='Streets Owned', value=f"🛣️ {streets_owned}")
+            st.metric(label='Districts Owned', value=f"🏘️ {districts_owned}") 
+            st.metric(label='Cities Owned', value=f"🏙️ {cities_owned}")       
+        with col3:
+            st_echarts(options=pie_chart_options, height='400px')    
+    
+    with st.container():
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.subheader('📋 Property Holdings')
+            st.write(df_owner[['city', 'district', 'street', 'lastSale', 'numSales']].sort_values(by='street').reset_index(drop=True))
+        with col2:
+            st.subheader('🛒 Market Listings')
+
+            if len(listings) > 0:
+                listings = listings[['city', 'district', 'street', 'salePrice', 'lastSale', 'osLink']]
+                listings['osLink'] = listings['osLink'].apply(make_clickable, args=('View on OpenSea',))
+                st.write(listings.to_html(escape=False, render_links=True, index=False), unsafe_allow_html=True)
+            else:
+                st.subheader('No Listings!')
+
 def render_owner_report(owner_name):   
     if owner_name != '':
         st.title(f'Owner Report - {owner_name}')
     else:
         st.title('Owner Report')
 
-    owner_name_lower = owner_name.lower()
-
-    frames = get_data_frames()
+    frames = snapshot['frames']
     df_owner_street = frames['ownerStreet']
     df_owner_district = frames['ownerDistrict']
     df_owner_city = frames['ownerCity']
 
     if owner_name is not None:
-        owner_label = 'ownerAddress' if owner_name_lower.startswith('0x') else 'ownerNameLower'
-
-        df_owner = df.loc[df[owner_label]==owner_name_lower]
-        streets_owned = df_owner_street.loc[df_owner_street[owner_label]==owner_name_lower].streetCount.sum()
-        districts_owned = df_owner_district.loc[df_owner_district[owner_label]==owner_name_lower].districtCount.sum()
-        cities_owned = df_owner_city.loc[df_owner_city[owner_label]==owner_name_lower].cityCount.sum()
-
-        listings = df_owner.loc[(df_owner['salePrice'] > 0) & (df_owner['saleType'] == 'basic')].sort_values(by='salePrice').fillna('Mint')
-
-        # Create a radial plot of the owner's properties by city
-        df_owner_cities = df_owner.groupby('city').size().reset_index(name='count')
-        df_owner_cities.rename(columns={'city': 'name', 'count': 'value'}, inplace=True)
-
-        COLOR_MAP = {
-            'Beige Bay': '#D6C58D',
-            'Orange Oasis': '#DF9F30',
-            'Yellow Yards': '#E8D322',
-            'Green Grove': '#00AB78',
-            'Purple Palms': '#8F00FF',
-            'Blue Bayside': '#2F5BAC',
-            'X AE X-II': '#FF0500',
-            'Special': '#808080'
-        }
+        # Usernames and ENS names resolve to the owner's address through the identity table
+        owner_address = resolve_owner(frames['identities'], owner_name)
 
-        colors = []
-
-        # Set the color array for each city in the result
-        owner_dict = df_owner_cities[['name', 'value']].to_dict(orient='records')
-
-        for row in owner_dict:
-            colors.append(COLOR_MAP[row['name'].strip()])   
-
-        pie_chart_options = {
-            'title': {'text': 'Holdings by City', 'left': 'center'},
-            'tooltip': {'trigger': 'item'},
-            'legend': None,
-            'series': [
-                {
-                    'name': 'Properties Owned',
-                    'type': 'pie',
-                    'color': colors,
-                    'radius': '50%',
-                    'data': df_owner_cities[['name', 'value']].to_dict(orient='records'),
-                    'emphasis': {
-                        'itemStyle': {
-                            'shadowBlur': 10,
-                            'shadowOffsetX': 0,
-                            'shadowColor': 'rgba(0,0,0,0.5)'
-                        }
-                    }
-                }
-            ],
-            'grid': {
-                'left': 0,
-                'top': 0,
-                'right': 0,
-                'bottom': 0
-            }
-        }
+        df_owner = df.loc[df['ownerAddress']==owner_address]
+        streets_owned = df_owner_street.loc[df_owner_street['ownerAddress']==owner_address].streetCount.sum()
+        districts_owned = df_owner_district.loc[df_owner_district['ownerAddress']==owner_address].districtCount.sum()
+        cities_owned = df_owner_city.loc[df_owner_city['ownerAddress']==owner_address].cityCount.sum()
 
-        with st.container():
-            col1, col2, col3, col4 = st.columns([1,1,2,2])
-        
-            with col1:
-                image_url = df_owner['imageUrl'].sample().values[0]
-                st.image(image_url, width=250, caption='Holding Highlight')  
-            with col2:
-                st.metric(label='Properties Owned', value=f"🏠 {len(df_owner)}")
-                st.metric(label='Streets Owned', value=f"🛣️ {streets_owned}")
-                st.metric(label='Districts Owned', value=f"🏘️ {districts_owned}") 
-                st.metric(label='Cities Owned', value=f"🏙️ {cities_owned}")       
-            with col3:
-                st_echarts(options=pie_chart_options, height='400px')    
-        
-        with st.container():
-            col1, col2 = st.columns(2)
+        if len(df_owner) == 0:
+            st.subheader('No properties found for this owner!')
+            return
+
+        df_sorted_listings = frames['listings']['sorted']
+        listings = df_sorted_listings.loc[df_sorted_listings.index.isin(df_owner.index)]
+
+        render_holdings(df_owner, listings, streets_owned, districts_owned, cities_owned)
 
-            with col1:
-                st.subheader('📋 Property Holdings')
-                st.write(df_owner[['city', 'district', 'street', 'lastSale', 'numSales']].sort_values(by='street').reset_index(drop=True))
-            with col2:
-                st.subheader('🛒 Market Listings')
+def render_wallets_report(wallet_input):
+    st.title('Wallets Report')
 
-                if len(listings) > 0:
-                    listings = listings[['city', 'district', 'street', 'salePrice', 'lastSale', 'osLink']]
-                    listings['osLink'] = listings['osLink'].apply(make_clickable, args=('View on OpenSea',))
-                    st.write(listings.to_html(escape=False, render_links=True, index=False), unsafe_allow_html=True)
-                else:
-                    st.subheader('No Listings!')
+    wallets = parse_wallets(wallet_input)
 
+    if len(wallets) == 0:
+        st.subheader('Enter one or more wallet addresses')
+        return
+
+    data = get_wallets_data(snapshot['frames'], wallets)
+    df_wallet_summary = data['wallets']
+
+    if len(data['properties']) == 0:
+        st.subheader('No properties found for these wallets!')
+        return
+
+    render_holdings(data['properties'], data['listings'], data['streets'], data['districts'], data['cities'])
+
+    with st.container():
+        st.subheader(f'👛 Wallet Breakdown ({len(df_wallet_summary)} of {len(wallets)} wallets hold properties)')
+        st.write(with_owner_names(df_wallet_summary, snapshot['frames']['identities']))
+        st.caption(f"Streets completed only by combining wallets: {data['streets'] - df_wallet_summary.streetCount.sum()}")
 
 def render_street_report(street_name):
     st.title(f'Street Report - {street_name}')
 
-    frames = get_data_frames()
-    
-    df = frames['all']
-    df_owner_street = frames['ownerStreet']
-
-    df_street = df.loc[df['street']==street_name]
-    city_name = df_street.iloc[0].city.strip()
-    image_url = df_street['imageUrl'].values[0]
+    frames = snapshot['frames']
+    data = get_street_data(frames, street_name)
 
-    listings = df_street.loc[(df_street['salePrice'] > 0) & (df_street['saleType'] == 'basic')].sort_values(by='salePrice').fillna('Mint')
-    floor_price = df_street['salePrice'].min() if df_street['salePrice'].min() > 0 else 'N/A'
-    prices = df_street['salePrice']
-    full_street_price = f'{prices.sort_values().head(7).sum():.2f}' if len(listings) > 6 else 'N/A'    
+    city_name = data['city']
+    image_url = get_image_urls(data['properties']).values[0]
 
-    df_owner_street_filtered = df_owner_street.loc[df_owner_street['street']==street_name] \
-        .sort_values(by='propertyCount', ascending=False).reset_index(drop=True)
+    listings = data['listings'].fillna('Mint')
+    floor_price = data['floorPrice'] if data['floorPrice'] is not None else 'N/A'
+    full_street_price = f"{data['fullStreetPrice']:.2f}" if data['fullStreetPrice'] is not None else 'N/A'
+    full_street_value = f"{data['fullStreetValue']:.2f}" if data['fullStreetValue'] is not None else 'N/A'
     
     with st.container():
         col1, col2, col3 = st.columns([1,2,2])
-        streets_completed = df_owner_street_filtered.streetCount.sum()
-        street_owner_count = len(df_owner_street_filtered.loc[df_owner_street_filtered['streetCount']>0])
+        streets_completed = data['streetsCompleted']
+        street_owner_count = data['streetOwners']
 
         with col1:
             st.image(image_url, width=250)
@@ -563,9 +500,14 @@ def render_street_report(street_name):
                 st.metric(label='$BRIX per Special', value=f'🧱 {SPECIAL_BRIX_DICT[street_name]}')
 
             st.metric(label='Floor Price', value=f'Ξ {floor_price}')
+            st.metric(label='Estimated Unit Value', value=f"Ξ {data['estimatedValue']}")
         with col3:
+            st.metric(label='Listed Below Estimate', value=f"💎 {data['belowEstimate']}")
+            st.metric(label='Estimated Total Value', value=f"Ξ {data['totalEstimatedValue']:.2f}")
+
             if city_name != 'Special':
                 st.metric(label='Cheapest Full Street', value=f'🏷️ {full_street_price}')
+                st.metric(label='Estimated Full Street', value=f'Ξ {full_street_value}')
                 st.metric(label='$BRIX per House', value=f"🧱 {PROP_BRIX_DICT[city_name]['house']}")
                 st.metric(label='$BRIX per Street', value=f"🧱 {PROP_BRIX_DICT[city_name]['street']}")
         
@@ -574,46 +516,38 @@ def render_street_report(street_name):
 
         with col1:
             st.subheader('📋 Owner Data')
-            st.write(df_owner_street_filtered[['ownerAddress','propertyCount','streetCount']])
+            st.write(with_owner_names(data['owners'], frames['identities']))
         
         with col2:
             st.subheader('🛒 Market Listings')
 
             if len(listings) > 0:
-                listings = listings[['ownerAddress', 'salePrice', 'lastSale', 'osLink']]
+                listings = with_owner_names(listings, frames['identities'])[['ownerName', 'salePrice', 'estimatedValue', 'belowEstimate', 'lastSale', 'osLink']]
                 listings['osLink'] = listings['osLink'].apply(make_clickable, args=('View on OpenSea',))
                 st.write(listings.to_html(escape=False, render_links=True, index=False), unsafe_allow_html=True)
             else:
                 st.subheader('No Listings!')
 
+    render_order_book(frames['orders'], 'street', street_name)
+
 def render_district_report(district_name):
     st.title(f'District Report - {district_name}')
 
-    frames = get_data_frames()
-    df = frames['all']
-    df_owner_street = frames['ownerStreet']
-    df_owner_district = frames['ownerDistrict']
-
-    df_district = df.loc[df['district']==district_name]
-    df_owner_street_filtered = df_owner_street.loc[df_owner_street['district']==district_name]
-    df_owner_district_filtered = df_owner_district[df_owner_district['district']==district_name]
+    frames = snapshot['frames']
+    data = get_district_data(frames, district_name)
 
-    owner_property_counts = df_owner_street_filtered.groupby('ownerAddress').propertyCount.sum()
-    df_owner_district_full = pd.merge(df_owner_district_filtered, owner_property_counts, on="ownerAddress")
-    values = {"ownerAddress": df_owner_district_full["ownerAddress"]}
-    df_owner_district_full.fillna(value=values, inplace=True)
+    city_name = data['city']
 
-    city_name = df_district.iloc[0].city.strip()
-
-    listings = df_district.loc[(df_district['salePrice'] > 0) & (df_district['saleType'] == 'basic')].sort_values(by='salePrice').fillna('Mint')
-    listings = listings[['ownerAddress', 'street', 'salePrice', 'lastSale', 'osLink']]
+    listings = data['listings'].fillna('Mint')
+    listings = with_owner_names(listings, frames['identities'])[['ownerName', 'street', 'salePrice', 'estimatedValue', 'belowEstimate', 'lastSale', 'osLink']]
     listings['osLink'] = listings['osLink'].apply(make_clickable, args=('View on OpenSea',))
-    floor_price = listings['salePrice'].min() if listings['salePrice'].min() > 0 else 'N/A'
+    floor_price = data['floorPrice'] if data['floorPrice'] is not None else 'N/A'
+    full_district_value = f"{data['fullDistrictValue']:.2f}" if data['fullDistrictValue'] is not None else 'N/A'
 
-    pure_street_count = df_owner_street_filtered.streetCount.sum()
-    district_count = df_owner_district_filtered.districtCount.sum()
+    pure_street_count = data['streetsBuilt']
+    district_count = data['districtsBuilt']
     
-    image_urls = df_district['imageUrl'].drop_duplicates().to_list()
+    image_urls = get_image_urls(data['properties']).drop_duplicates().to_list()
 
     with st.container():
         col1, col2, col3 = st.columns([2,1,1])
@@ -624,7 +558,11 @@ def render_district_report(district_name):
             st.metric(label='Streets Built', value=f'🛣️ {pure_street_count}')
             st.metric(label='Districts Built', value=f'🏘️ {district_count}')
             st.metric(label='Floor Price', value=f'Ξ {floor_price}')
+            st.metric(label='Estimated Unit Value', value=f"Ξ {data['estimatedValue']}")
+            st.metric(label='Listed Below Estimate', value=f"💎 {data['belowEstimate']}")
         with col3:
+            st.metric(label='Estimated Full District', value=f'Ξ {full_district_value}')
+            st.metric(label='Estimated Total Value', value=f"Ξ {data['totalEstimatedValue']:.2f}")
             st.metric(label='$BRIX per House', value=f"🧱 {PROP_BRIX_DICT[city_name]['house']}")
             st.metric(label='$BRIX per Street', value=f"🧱 {PROP_BRIX_DICT[city_name]['street']}")
             st.metric(label='$BRIX per District', value=f"🧱 {PROP_BRIX_DICT[city_name]['district']}")  
@@ -634,55 +572,38 @@ def render_district_report(district_name):
 
         with col1:
             st.subheader(f"📋 Owner Data")
-            st.write(df_owner_district_full[["ownerAddress", "propertyCount", "streetsInDistrict", "districtCount"]].sort_values(by="propertyCount", ascending=False))
+            st.write(with_owner_names(data['owners'], frames['identities']))
         with col2:
             st.subheader(f"🛒 Market Listings")
             st.write(listings.to_html(escape=False, render_links=True, index=False), unsafe_allow_html=True)
 
+    render_order_book(frames['orders'], 'district', district_name)
+
 def render_city_report(city_name):
     st.title(f'City Report - {city_name}') 
 
-    # There are some errant images for Beige Bay that say "Pidgeon Park" instead of "Pigeon Park"
-    bad_image = 'https://lh3.googleusercontent.com/5wlasmr-xFirlE2SX2rmnCg3A88Hu2El5k9LzptwMhlhFsmsxe_VdtHIencLJp7iB7gedQohOXyZ_Ts6G7aHByR-a9GOsay1Z-7m7g'
-
-    frames = get_data_frames()
-    df = frames['all']
-    df_owner_street = frames['ownerStreet']
-    df_owner_city = frames['ownerCity']
-
-    df_city = df.loc[df['city']==city_name]
-    df_owner_street_filtered = df_owner_street.loc[df_owner_street['city']==city_name]
-    df_owner_city_filtered = df_owner_city[df_owner_city['city']==city_name]
-
-    owner_property_counts = df_owner_street_filtered.groupby('ownerAddress').propertyCount.sum()
-    owner_street_counts = df_owner_street_filtered.groupby('ownerAddress').streetCount.sum()
-    df_owner_city_full = pd.merge(pd.merge(df_owner_city_filtered, owner_property_counts, on="ownerAddress"), owner_street_counts, on="ownerAddress")
-    values = {"ownerAddress": df_owner_city_full["ownerAddress"]}
-    df_owner_city_full.fillna(value=values, inplace=True)
+    frames = snapshot['frames']
+    data = get_city_data(frames, city_name)
+    df_city = data['properties']
 
     # Build an array of arrays with images of each district
     image_urls = []
-    districts_in_city = df_owner_street_filtered['district'].drop_duplicates().to_list()
 
-    for district in districts_in_city:
-        district_images = df.loc[df['district']==district]['imageUrl'].drop_duplicates().to_list()
+    for district in data['districts']:
+        district_images = get_image_urls(df.loc[df['district']==district]).drop_duplicates().to_list()
         image_urls.append(district_images)
 
     # Choose the array of images for a random district in the city
     district_image_urls = random.choice(image_urls)
 
-    # Remove the bad image URL if it exists
-    if bad_image in district_image_urls:
-        district_image_urls.remove(bad_image)
+    pure_street_count = data['streetsBuilt']
+    district_count = data['districtsBuilt']
+    city_count = data['citiesBuilt']
 
-    pure_street_count = df_owner_city_full.streetCount.sum()
-    district_count = df_owner_city_full.districtsInCity.sum()
-    city_count = df_owner_city_full.cityCount.sum()
-
-    listings = df_city.loc[(df_city['salePrice'] > 0) & (df_city['saleType'] == 'basic')].sort_values(by='salePrice').fillna('Mint')
-    listings = listings[['ownerAddress', 'district', 'street', 'salePrice', 'lastSale', 'osLink']]
+    listings = data['listings'].fillna('Mint')
+    listings = with_owner_names(listings, frames['identities'])[['ownerName', 'district', 'street', 'salePrice', 'estimatedValue', 'belowEstimate', 'lastSale', 'osLink']]
     listings['osLink'] = listings['osLink'].apply(make_clickable, args=('View on OpenSea',))
-    floor_price = listings['salePrice'].min() if listings['salePrice'].min() > 0 else 'N/A'
+    floor_price = data['floorPrice'] if data['floorPrice'] is not None else 'N/A'
 
     with st.container():
         col1, col2, col3 = st.columns([2,1,1])
@@ -694,7 +615,10 @@ def render_city_report(city_name):
             st.metric(label='Districts Built', value=f'🏘️ {district_count}')
             st.metric(label='Cities Built', value=f'🏘️ {city_count}')
             st.metric(label='Floor Price', value=f'Ξ {floor_price}')
+            st.metric(label='Estimated Unit Value', value=f"Ξ {data['estimatedValue']}")
+            st.metric(label='Listed Below Estimate', value=f"💎 {data['belowEstimate']}")
         with col3:
+            st.metric(label='Estimated Total Value', value=f"Ξ {data['totalEstimatedValue']:.2f}")
             st.metric(label='$BRIX per House', value=f"🧱 {PROP_BRIX_DICT[city_name]['house']}")
             st.metric(label='$BRIX per Street', value=f"🧱 {PROP_BRIX_DICT[city_name]['street']}")
             st.metric(label='$BRIX per District', value=f"🧱 {PROP_BRIX_DICT[city_name]['district']}")
@@ -705,7 +629,7 @@ def render_city_report(city_name):
 
         with col1:
             st.subheader(f"📋 Owner Data")
-            st.write(df_owner_city_full[["ownerAddress", "propertyCount", "streetCount", "districtsInCity", "cityCount"]].sort_values(by="propertyCount", ascending=False))
+            st.write(with_owner_names(data['owners'], frames['identities']))
             st.download_button(
                 "Download Owner Snapshot",
                 df_city[['ownerAddress', 'tokenId']].to_csv(index=False).encode('utf-8'),
@@ -717,15 +641,18 @@ def render_city_report(city_name):
             st.subheader(f"🛒 Market Listings")
             st.write(listings.to_html(escape=False, render_links=True, index=False), unsafe_allow_html=True)
 
+    render_order_book(frames['orders'], 'city', city_name)
+
 
 def init():
     report_choice_key = 'reportChoice'
     owner_input_key = 'ownerInput'
+    wallets_input_key = 'walletsInput'
     street_choice_key = 'streetChoice'
     district_choice_key = 'districtChoice'
     city_choice_key = 'cityChoice'
 
-    report_options = ['overview', 'owner', 'street', 'district', 'city']
+    report_options = ['overview', 'owner', 'wallets', 'street', 'district', 'city']
     street_options = df['street'].drop_duplicates().sort_values().to_list()
     district_options = df[df['district']!='Special']['district'].drop_duplicates().sort_values().to_list()
     city_options = [
@@ -741,12 +668,14 @@ def init():
     query_params = st.experimental_get_query_params()
     query_report_choice = query_params['report'][0] if 'report' in query_params else None
     query_owner_input = query_params['owner'][0] if 'owner' in query_params else None
+    query_wallets_input = query_params['wallets'][0] if 'wallets' in query_params else None
     query_street_choice = query_params['street'][0] if 'street' in query_params else None
     query_district_choice = query_params['district'][0] if 'district' in query_params else None
     query_city_choice = query_params['city'][0] if 'city' in query_params else None
 
     st.session_state[report_choice_key] = query_report_choice if query_report_choice in report_options else report_options[0]
     st.session_state[owner_input_key] = query_owner_input if query_owner_input is not None else ''
+    st.session_state[wallets_input_key] = query_wallets_input.replace(',', '\n') if query_wallets_input is not None else ''
     st.session_state[street_choice_key] = query_street_choice if query_street_choice in street_options else street_options[0]
     st.session_state[district_choice_key] = query_district_choice if query_district_choice in district_options else district_options[0]
     st.session_state[city_choice_key] = query_city_choice if query_city_choice in city_options else city_options[0]
@@ -768,6 +697,9 @@ def init():
         if report_choice == 'owner':
             query_params['owner'] = st.session_state[owner_input_key]
             reset_params('owner', query_params)
+        elif report_choice == 'wallets':
+            query_params['wallets'] = ','.join(parse_wallets(st.session_state[wallets_input_key]))
+            reset_params('wallets', query_params)
         elif report_choice == 'street':
             query_params['street'] = st.session_state[street_choice_key]
             reset_params('street', query_params)
@@ -803,6 +735,13 @@ def init():
             render_owner_report(owner_input)
         else:
             st.title('Owner Report')
+    elif report_choice == 'wallets':
+        with st.form(key='wallets_form'):
+            with st.sidebar:
+                st.text_area('Wallet Addresses (one per line or comma separated)', key=wallets_input_key)
+                st.form_submit_button(label='Submit', on_click=update_session_state)
+
+        render_wallets_report(st.session_state[wallets_input_key])
     elif report_choice == 'street':
         with st.form(key='street_form'):
             with st.sidebar: